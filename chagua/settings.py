@@ -22,13 +22,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'core.middleware.RateLimitMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -99,6 +100,20 @@ STATICFILES_FINDERS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Listing images, post media and payment proofs are streamed to disk while hashed and
+# stored once per distinct content (see core.storage). UPLOAD_LIMITS maps each form
+# field to the content types it accepts and the maximum size in bytes for each.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_LIMITS = {
+    'image': {'image/jpeg': 5 * 1024 * 1024, 'image/png': 5 * 1024 * 1024},
+    'payment_proof': {'image/jpeg': 5 * 1024 * 1024, 'image/png': 5 * 1024 * 1024},
+    'media': {'image/jpeg': 10 * 1024 * 1024, 'image/png': 10 * 1024 * 1024, 'video/mp4': 50 * 1024 * 1024},
+}
+
 DEFAULT_CURRENCY = 'USD'
 EXCHANGE_RATES = {
     'KES': {'USD': 0.0077, 'GBP': 0.0058, 'EUR': 0.0068, 'KES': 1.0},
@@ -107,6 +122,13 @@ EXCHANGE_RATES = {
     'EUR': {'KES': 146.34, 'USD': 1.14, 'GBP': 0.85, 'EUR': 1.0},
 }
 
+# Stored ExchangeRate rows win; EXCHANGE_RATES above is only the fallback table.
+CURRENCY_RATES = {
+    'PIVOT': 'USD',
+    'TIMEOUT': 3600,
+    'LOCAL_TTL': 60,
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CACHES = {
@@ -119,5 +141,92 @@ CACHES = {
     }
 }
 
+# Requests per sliding window, keyed by URL name and by user (or IP when anonymous).
+RATELIMIT_POLICIES = {
+    'default': {'limit': 100, 'window': 60},
+    'home': {'limit': 300, 'window': 60},
+    'search': {'limit': 120, 'window': 60},
+    'signup': {'limit': 5, 'window': 300},
+    'login': {'limit': 10, 'window': 60},
+    'chat': {'limit': 30, 'window': 60},
+}
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Samples SAMPLE_RATE of requests for SQL count/time, cache hits and latency, exported
+# on /metrics/ and logged to 'core.profiling'. Budgets are max queries per URL name;
+# BUDGET_ACTION 'raise' turns an overrun into QueryBudgetExceeded (use it in tests).
+PROFILING = {
+    'SAMPLE_RATE': 0.01,
+    'BUDGET_ACTION': 'log',
+    'BUDGETS': {
+        'home': 8,
+        'search': 6,
+        'listing': 6,
+        'dashboard': 8,
+        'chat': 8,
+    },
+}
+
+# Listing pages are cached in a per-process LRU (LOCAL_TTL seconds) in front of CACHES.
+LISTING_CACHE = {
+    'LOCAL_SIZE': 1024,
+    'LOCAL_TTL': 5,
+    'TIMEOUT': 300,
+    'RELATED_TIMEOUT': 60,
+}
+
+# Listing views are counted in Redis ('local' counts in-process) and added to
+# RentalItem.views every FLUSH_INTERVAL seconds; also see the flush_view_counts command.
+# While Redis is down, views are counted in-process and Redis is retried every RETRY_INTERVAL.
+VIEW_COUNTER = {
+    'BACKEND': 'redis',
+    'FLUSH_INTERVAL': 30.0,
+    'BATCH_SIZE': 500,
+    'RETRY_INTERVAL': 5.0,
+}
+
+# UserAction rows are buffered in-process and written with bulk_create. SAMPLE_RATES
+# keeps only a fraction of high-volume actions, e.g. {'search': 0.25}.
+ACTION_PIPELINE = {
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 5.0,
+    'MAX_PENDING': 5000,
+    'SAMPLE_RATES': {},
+}
+
+# Chat messages from all sockets in a process are inserted in batches of up to BATCH_SIZE.
+CHAT_WRITER = {
+    'BATCH_SIZE': 100,
+    'MAX_DELAY': 0.01,
+    'MAX_PENDING': 1000,
+}
+
+# Channel-layer pushes queued per process; past MAX_PENDING they are dropped and replayed on reconnect.
+NOTIFICATION_DISPATCH = {
+    'MAX_PENDING': 10000,
+    'BATCH_SIZE': 100,
+}
+
+# Uploaded images get resized WebP and JPEG copies (longest side in px per size) from
+# WORKERS background threads per process; see also the generate_media_variants command.
+MEDIA_PIPELINE = {
+    'SIZES': {'thumb': 160, 'card': 480, 'full': 1600},
+    'QUALITY': 80,
+    'WORKERS': 2,
+}
+
+# Item-item recommendations rebuilt by the build_recommendations command (needs NumPy).
+# WEIGHTS is what one booking, one 5-star review and one listing view count for.
+RECOMMENDATIONS = {
+    'NEIGHBOURS': 20,
+    'PER_USER': 20,
+    'BLOCK_SIZE': 512,
+    'WEIGHTS': {'reservation': 3.0, 'review': 2.0, 'view': 1.0},
+}
+
+# Use 'core.search.PostgresSearchBackend' when running on PostgreSQL.
+SEARCH_BACKEND = 'core.search.SQLiteFTSBackend'
+SEARCH_RATING_WEIGHT = 0.5
+
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
@@ -1,12 +1,36 @@
 from django.contrib import admin
-from .models import UserProfile, RentalItem, Reservation, SocialPost, Review, UserAction, Message, Badge, UserBadge
+from django.urls import reverse
+from notifications.notify import notify_many
+from .models import UserProfile, RentalItem, Reservation, BookedPeriod, SocialPost, Comment, Review, UserAction, Message, Badge, UserBadge, ExchangeRate
 
 admin.site.register(UserProfile)
-admin.site.register(RentalItem)
 admin.site.register(Reservation)
+admin.site.register(BookedPeriod)
 admin.site.register(SocialPost)
+admin.site.register(Comment)
 admin.site.register(Review)
 admin.site.register(UserAction)
 admin.site.register(Message)
 admin.site.register(Badge)
-admin.site.register(UserBadge)
\ No newline at end of file
+admin.site.register(UserBadge)
+admin.site.register(ExchangeRate)
+
+@admin.register(RentalItem)
+class RentalItemAdmin(admin.ModelAdmin):
+    list_display = ('title', 'owner', 'type', 'verified')
+    list_filter = ('verified', 'type')
+    actions = ['verify_listings']
+
+    @admin.action(description='Verify selected listings and notify past renters')
+    def verify_listings(self, request, queryset):
+        verified = 0
+        for item in queryset.filter(verified=False).select_related('owner'):
+            item.verified = True
+            item.save(update_fields=['verified'])
+            renters = (
+                Reservation.objects.filter(item__owner=item.owner_id).exclude(renter=item.owner_id)
+                .values_list('renter_id', flat=True).distinct()
+            )
+            notify_many(renters, 'listing', f'{item.owner.username} listed {item.title}', url=reverse('listing', args=[item.pk]))
+            verified += 1
+        self.message_user(request, f'Verified {verified} listings.')
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import F, Sum, Count, Case, When, Value, IntegerField
+from django.utils import timezone
+from .currency import CENT, rate, rate_table
+from .models import RentalItem, Reservation, Review, ListingDailyStats
+
+STAT_FIELDS = ['views', 'bookings', 'revenue', 'rating_sum', 'review_count']
+EVENT_FIELDS = ['bookings', 'revenue', 'rating_sum', 'review_count']
+DASHBOARD_DAYS = 30
+
+def ensure_rows(day, owners):
+    # Missing rows are inserted first and then incremented, so two writers racing on the
+    # same new row lose only an ignored insert, never an increment.
+    ListingDailyStats.objects.bulk_create(
+        [ListingDailyStats(item_id=item_id, owner_id=owner_id, date=day) for item_id, owner_id in owners.items()],
+        ignore_conflicts=True,
+    )
+
+@transaction.atomic
+def record(item_id, owner_id, day, **deltas):
+    ensure_rows(day, {item_id: owner_id})
+    ListingDailyStats.objects.filter(item_id=item_id, date=day).update(**{name: F(name) + delta for name, delta in deltas.items()})
+
+@transaction.atomic
+def record_views(counts, day=None):
+    day = day or timezone.localdate()
+    owners = dict(RentalItem.objects.filter(pk__in=list(counts)).values_list('id', 'owner_id'))
+    if not owners:
+        return
+    ensure_rows(day, owners)
+    ListingDailyStats.objects.filter(item_id__in=owners, date=day).update(views=F('views') + Case(
+        *[When(item_id=pk, then=Value(counts[pk])) for pk in owners],
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+def event_totals(day):
+    # Bookings, revenue and ratings for one day recomputed from the source tables, by listing.
+    totals = {}
+    reservations = Reservation.objects.exclude(status='canceled').filter(created_at__date=day)
+    reviews = Review.objects.filter(item__isnull=False, created_at__date=day)
+    for queryset, aggregates in (
+        (reservations, {'bookings': Count('id'), 'revenue': Sum('total_cost')}),
+        (reviews, {'rating_sum': Sum('rating'), 'review_count': Count('id')}),
+    ):
+        for row in queryset.values('item_id', 'item__owner_id').annotate(**aggregates).order_by():
+            entry = totals.setdefault(row['item_id'], {'owner_id': row['item__owner_id']})
+            entry.update({name: row[name] for name in aggregates})
+    return totals
+
+@transaction.atomic
+def compact(day):
+    # Rewrites the event columns of one day from the source tables, repairing increments lost
+    # to crashes or edits made outside the ORM. Views have no source table and are kept.
+    totals = event_totals(day)
+    ensure_rows(day, {item_id: values['owner_id'] for item_id, values in totals.items()})
+    rows = {row.item_id: row for row in ListingDailyStats.objects.select_for_update().filter(date=day)}
+    changed = []
+    for key, row in rows.items():
+        values = totals.get(key, {})
+        fresh = {name: values.get(name) or 0 for name in EVENT_FIELDS}
+        # Decimal sums can come back with extra digits on SQLite.
+        fresh['revenue'] = Decimal(fresh['revenue']).quantize(CENT, ROUND_HALF_UP)
+        if any(getattr(row, name) != value for name, value in fresh.items()):
+            for name, value in fresh.items():
+                setattr(row, name, value)
+            changed.append(row)
+    ListingDailyStats.objects.bulk_update(changed, EVENT_FIELDS, batch_size=500)
+    removed, _ = ListingDailyStats.objects.filter(date=day, **{name: 0 for name in STAT_FIELDS}).delete()
+    return len(changed), removed
+
+def owner_summary(owner, currency, days=DASHBOARD_DAYS):
+    stats = ListingDailyStats.objects.filter(owner=owner)
+    since = timezone.localdate() - timedelta(days=days - 1)
+    sums = {name: Sum(name) for name in STAT_FIELDS}
+    totals = dict.fromkeys(STAT_FIELDS, 0)
+    series = {since + timedelta(days=n): dict.fromkeys(STAT_FIELDS, 0) for n in range(days)}
+    table = rate_table()
+    # Revenue is summed per listing currency and converted once per currency.
+    for row in stats.values('item__base_currency').annotate(**sums).order_by():
+        accumulate(totals, row, rate(row['item__base_currency'], currency, table))
+    for row in stats.filter(date__gte=since).values('date', 'item__base_currency').annotate(**sums).order_by():
+        accumulate(series[row['date']], row, rate(row['item__base_currency'], currency, table))
+    for values in [totals, *series.values()]:
+        values['revenue'] = Decimal(values['revenue']).quantize(CENT, ROUND_HALF_UP)
+    totals['rating'] = totals['rating_sum'] / totals['review_count'] if totals['review_count'] else 0.0
+    return totals, [{'date': day, **values} for day, values in series.items()]
+
+def top_listings(owner, days=DASHBOARD_DAYS, limit=5):
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        ListingDailyStats.objects.filter(owner=owner, date__gte=since)
+        .values('item_id', 'item__title')
+        .annotate(views=Sum('views'), bookings=Sum('bookings'))
+        .order_by('-views', '-bookings')[:limit]
+    )
+
+def accumulate(target, row, factor):
+    for name in STAT_FIELDS:
+        value = row[name] or 0
+        target[name] += value * factor if name == 'revenue' else value
+
+def contribution(instance):
+    # What one reservation or review adds to its listing's row for the day it was created.
+    if isinstance(instance, Reservation):
+        counted = instance.status != 'canceled'
+        return {'bookings': int(counted), 'revenue': instance.total_cost if counted else Decimal(0)}
+    if instance.item_id is None:
+        return {}
+    return {'rating_sum': instance.rating, 'review_count': 1}
+
+def record_change(instance, before, after):
+    deltas = {name: after.get(name, 0) - before.get(name, 0) for name in {*before, *after}}
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    # The listing may be gone by now, e.g. when its deletion cascaded to this row.
+    owner_id = RentalItem.objects.filter(pk=instance.item_id).values_list('owner_id', flat=True).first()
+    if deltas and owner_id:
+        record(instance.item_id, owner_id, timezone.localdate(instance.created_at), **deltas)
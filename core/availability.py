@@ -0,0 +1,34 @@
+from datetime import datetime, time, timedelta
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import BookedPeriod
+
+# Periods are half-open [start, end). Lookups go through the (item, end, start)
+# index: filtering on end > start first skips the item's whole booking history.
+
+def overlapping(item_id, start, end):
+    return BookedPeriod.objects.filter(item_id=item_id, end__gt=start, start__lt=end)
+
+def filter_available(queryset, start, end):
+    busy = BookedPeriod.objects.filter(item=OuterRef('pk'), end__gt=start, start__lt=end)
+    return queryset.filter(~Exists(busy))
+
+def book(item, start, end, reservation=None):
+    return BookedPeriod.objects.create(item=item, reservation=reservation, start=start, end=end)
+
+def day_bounds(first_day, last_day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+def booked_days(item, first_day, last_day):
+    start, end = day_bounds(first_day, last_day)
+    days = {}
+    for period_start, period_end in overlapping(item.pk, start, end).values_list('start', 'end'):
+        current = max(timezone.localtime(period_start).date(), first_day)
+        stop = min(timezone.localtime(period_end - timedelta(microseconds=1)).date(), last_day)
+        while current <= stop:
+            days[current.isoformat()] = 'booked'
+            current += timedelta(days=1)
+    return days
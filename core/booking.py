@@ -0,0 +1,52 @@
+import random
+import sqlite3
+import time
+from django.db import transaction, OperationalError
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from .models import RentalItem
+from .availability import overlapping, book
+
+MAX_ATTEMPTS = 5
+# PostgreSQL serialization failure and deadlock.
+RETRY_SQLSTATES = {'40001', '40P01'}
+# SQLITE_BUSY (another connection holds the write lock) and SQLITE_LOCKED (a table lock
+# in a shared-cache database, e.g. the in-memory test database).
+RETRY_SQLITE_CODES = {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+RETRY_SQLITE_MESSAGES = ('database is locked', 'database table is locked')
+
+class BookingConflict(Exception):
+    pass
+
+def is_lock_failure(error):
+    cause = error.__cause__
+    sqlite_code = getattr(cause, 'sqlite_errorcode', None)
+    if sqlite_code is not None:
+        return sqlite_code & 0xff in RETRY_SQLITE_CODES
+    sqlstate = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+    # Python < 3.11 does not expose SQLite error codes, so fall back to the message.
+    return sqlstate in RETRY_SQLSTATES or any(message in str(error) for message in RETRY_SQLITE_MESSAGES)
+
+def reserve(item, reservation, start, end):
+    reservation.item = item
+    reservation.start_date = start
+    reservation.end_date = end
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Bumping the version takes the item's row lock (the database write lock on
+                # SQLite) before the overlap check, so concurrent bookers of one item queue
+                # here the way SELECT ... FOR UPDATE would, on every backend.
+                RentalItem.objects.filter(pk=item.pk).update(booking_version=F('booking_version') + 1)
+                if overlapping(item.pk, start, end).exists():
+                    raise BookingConflict(_("This item is not available for the selected dates."))
+                reservation.save()
+                book(item, start, end, reservation=reservation)
+            return reservation
+        except OperationalError as error:
+            if not is_lock_failure(error):
+                raise
+            reservation.pk = None
+            reservation._state.adding = True
+            time.sleep(0.02 * 2 ** attempt + random.random() * 0.02)
+    raise BookingConflict(_("This item is being booked by someone else right now. Please try again."))
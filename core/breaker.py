@@ -0,0 +1,29 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    # After a failure the shared store is left alone for `cooldown` seconds and callers use
+    # their in-process fallback; only the first failure of an outage logs a traceback.
+    def __init__(self, name, cooldown=5.0):
+        self.name = name
+        self.cooldown = cooldown
+        self.retry_at = 0.0
+        self.failing = False
+
+    def allow(self):
+        return time.monotonic() >= self.retry_at
+
+    def success(self):
+        if self.failing:
+            self.failing = False
+            logger.info('%s available again', self.name)
+
+    def failure(self):
+        self.retry_at = time.monotonic() + self.cooldown
+        if self.failing:
+            logger.warning('%s still unavailable, retrying in %ss', self.name, self.cooldown)
+        else:
+            self.failing = True
+            logger.warning('%s unavailable, using the in-process fallback', self.name, exc_info=True)
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import track
+
+MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+class LocalLRU:
+    def __init__(self, maxsize=1024, ttl=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+class TieredCache:
+    # Each process keeps a small LRU in front of the shared cache. Deletes only reach the
+    # local tier of the process that made them, so LOCAL_TTL bounds staleness elsewhere.
+    def __init__(self, local, remote=cache, timeout=300):
+        self.local = local
+        self.remote = remote
+        self.timeout = timeout
+        self.hits = self.misses = 0
+
+    def get_or_set(self, key, compute, timeout=None):
+        value = self.local.get(key)
+        if value is MISSING:
+            value = self.remote_call('get', key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+                track('cache_misses')
+                value = compute()
+                self.remote_call('set', key, value, timeout or self.timeout)
+            else:
+                self.hits += 1
+                track('cache_hits')
+            self.local.set(key, value)
+        else:
+            self.hits += 1
+            track('cache_hits')
+        return value
+
+    def delete_many(self, keys):
+        self.local.delete_many(keys)
+        self.remote_call('delete_many', keys)
+
+    def remote_call(self, method, *args):
+        # A cache outage should cost latency, not fail the request or the write behind it.
+        try:
+            return getattr(self.remote, method)(*args)
+        except Exception:
+            logger.warning('Shared cache %s failed', method, exc_info=True)
+            return MISSING
+
+config = getattr(settings, 'LISTING_CACHE', {})
+listing_cache = TieredCache(
+    LocalLRU(maxsize=config.get('LOCAL_SIZE', 1024), ttl=config.get('LOCAL_TTL', 5)),
+    timeout=config.get('TIMEOUT', 300),
+)
+RELATED_TIMEOUT = config.get('RELATED_TIMEOUT', 60)
+
+def listing_key(pk, part=None):
+    return f'listing:{pk}:{part}' if part else f'listing:{pk}'
+
+def related_key(item_type):
+    return f'listing:related:{item_type}'
+
+def reviewed_key(pk, user_id):
+    return listing_key(pk, f'reviewed:{user_id}')
+
+def invalidate_listing(pk, *parts):
+    listing_cache.delete_many([listing_key(pk, part) for part in parts or (None,)])
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import Q, Max, Count
+from .feed import keyset_page
+from .models import Message, conversation_key
+
+logger = logging.getLogger(__name__)
+
+CHAT_PAGE_SIZE = 30
+REPLAY_LIMIT = 500
+
+def history(user, other, cursor=None, page_size=CHAT_PAGE_SIZE):
+    messages, next_cursor = keyset_page(
+        Message.objects.filter(conversation=conversation_key(user.pk, other.pk)).select_related('sender').order_by('-timestamp', '-id'),
+        cursor,
+        page_size,
+        field='timestamp',
+    )
+    messages.reverse()
+    return messages, next_cursor
+
+def message_payload(message):
+    return {
+        'id': message.pk,
+        'sender': message.sender.username,
+        'sender_id': message.sender_id,
+        'receiver_id': message.receiver_id,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+def mark_read(user, messages):
+    # Only what the reader has actually been shown; older unread messages stay unread.
+    unread = [m.pk for m in messages if m.receiver_id == user.pk and not m.read]
+    if unread:
+        Message.objects.filter(pk__in=unread).update(read=True)
+    return len(unread)
+
+def inbox(user, limit=50):
+    conversations = list(
+        Message.objects.filter(Q(sender=user) | Q(receiver=user))
+        .values('conversation')
+        .annotate(last_id=Max('id'), unread=Count('id', filter=Q(receiver=user, read=False)))
+        .order_by('-last_id')[:limit]
+    )
+    last = Message.objects.select_related('sender', 'receiver').in_bulk([c['last_id'] for c in conversations])
+    entries = []
+    for conversation in conversations:
+        message = last[conversation['last_id']]
+        entries.append({
+            'user': message.receiver if message.sender_id == user.pk else message.sender,
+            'last_message': message,
+            'unread': conversation['unread'],
+        })
+    return entries
+
+def replay(user, after, limit=REPLAY_LIMIT):
+    # Message ids only grow, so the last id a client saw is enough to resume from.
+    return list(
+        Message.objects.filter(Q(sender=user) | Q(receiver=user), id__gt=after)
+        .select_related('sender').order_by('id')[:limit]
+    )
+
+def save_messages(messages):
+    Message.objects.bulk_create(messages)
+    return messages
+
+class MessageWriter:
+    # Coalesces messages arriving on any socket in this process into one INSERT per batch.
+    # Each caller still awaits its own row, so it can ack with the server-assigned id.
+    def __init__(self, batch_size=100, max_delay=0.01, max_pending=1000):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.loop = None
+        self.queue = None
+        self.task = None
+
+    async def save(self, sender, receiver_id, content):
+        message = Message(sender=sender, receiver_id=receiver_id, content=content, conversation=conversation_key(sender.pk, receiver_id))
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop or self.task is None:
+            self.loop = loop
+            self.queue = asyncio.Queue(self.max_pending)
+            # The event loop only holds a weak reference to its tasks.
+            self.task = loop.create_task(self.run(self.queue))
+            self.task.add_done_callback(self.finished)
+        future = loop.create_future()
+        # A full queue makes senders wait for the database instead of growing without bound.
+        await self.queue.put((message, future))
+        return await future
+
+    def finished(self, task):
+        if self.task is task:
+            self.task = None
+
+    async def run(self, queue):
+        while True:
+            batch = [await queue.get()]
+            if queue.qsize() < self.batch_size:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await database_sync_to_async(save_messages)([message for message, _ in batch])
+            except Exception as exc:
+                logger.exception('Failed to save %d chat messages', len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for message, future in batch:
+                if not future.done():
+                    future.set_result(message)
+
+config = getattr(settings, 'CHAT_WRITER', {})
+message_writer = MessageWriter(
+    batch_size=config.get('BATCH_SIZE', 100),
+    max_delay=config.get('MAX_DELAY', 0.01),
+    max_pending=config.get('MAX_PENDING', 1000),
+)
@@ -0,0 +1,173 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Case, When, Value, PositiveIntegerField
+from .models import RentalItem
+from .analytics import record_views
+from .breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+class LocalViewCounter:
+    def __init__(self, shards=16):
+        self.shards = [(threading.Lock(), Counter()) for _ in range(shards)]
+        self.flushing = Counter()
+        self.flush_lock = threading.Lock()
+
+    def incr(self, pk, amount=1):
+        lock, counts = self.shards[pk % len(self.shards)]
+        with lock:
+            counts[pk] += amount
+
+    @contextmanager
+    def draining(self):
+        with self.flush_lock:
+            for lock, counts in self.shards:
+                with lock:
+                    self.flushing.update(counts)
+                    counts.clear()
+            yield dict(self.flushing)
+            self.flushing = Counter()
+
+    def pending(self, ids):
+        totals = Counter()
+        for pk in ids:
+            lock, counts = self.shards[pk % len(self.shards)]
+            with lock:
+                totals[pk] = counts[pk]
+            totals[pk] += self.flushing[pk]
+        return totals
+
+class RedisViewCounter:
+    key = 'views:pending'
+    flushing_key = 'views:flushing'
+    lock_key = 'views:flush-lock'
+
+    def __init__(self, client):
+        self.client = client
+
+    def incr(self, pk, amount=1):
+        self.client.hincrby(self.key, pk, amount)
+
+    @contextmanager
+    def draining(self):
+        # Only one process flushes at a time. A flushing hash left behind by a flush that
+        # died before committing is retried as-is instead of being renamed over.
+        lock = self.client.lock(self.lock_key, timeout=300)
+        if not lock.acquire(blocking=False):
+            yield {}
+            return
+        try:
+            if not self.client.exists(self.flushing_key) and self.client.exists(self.key):
+                self.client.rename(self.key, self.flushing_key)
+            yield {int(pk): int(n) for pk, n in self.client.hgetall(self.flushing_key).items()}
+            self.client.delete(self.flushing_key)
+        finally:
+            lock.release()
+
+    def pending(self, ids):
+        ids = list(ids)
+        if not ids:
+            return Counter()
+        pipe = self.client.pipeline()
+        pipe.hmget(self.key, ids)
+        pipe.hmget(self.flushing_key, ids)
+        queued, flushing = pipe.execute()
+        return Counter({pk: int(a or 0) + int(b or 0) for pk, a, b in zip(ids, queued, flushing)})
+
+class ViewCounter:
+    def __init__(self, primary, batch_size=500, flush_interval=30.0, retry_interval=5.0):
+        self.primary = primary
+        self.breaker = CircuitBreaker('View counter store', retry_interval)
+        self.local = primary if isinstance(primary, LocalViewCounter) else LocalViewCounter()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.worker_pid = None
+
+    def incr(self, pk):
+        if self.breaker.allow():
+            try:
+                self.primary.incr(pk)
+                self.breaker.success()
+                self.ensure_worker()
+                return
+            except Exception:
+                self.breaker.failure()
+        self.local.incr(pk)
+        self.ensure_worker()
+
+    def pending(self, ids):
+        ids = list(ids)
+        totals = self.local.pending(ids)
+        if self.primary is not self.local and self.breaker.allow():
+            try:
+                totals.update(self.primary.pending(ids))
+            except Exception:
+                self.breaker.failure()
+        return totals
+
+    def flush(self, local_only=False):
+        flushed = 0
+        for store in [self.local] if local_only or self.primary is self.local else [self.primary, self.local]:
+            try:
+                with store.draining() as counts:
+                    apply_view_counts(counts, self.batch_size)
+                flushed += sum(counts.values())
+            except Exception:
+                logger.exception('Failed to flush view counts')
+        return flushed
+
+    def ensure_worker(self):
+        if self.worker_pid == os.getpid():
+            return
+        with self.lock:
+            if self.worker_pid != os.getpid():
+                self.worker_pid = os.getpid()
+                threading.Thread(target=self.run, name='view-counter', daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+@transaction.atomic
+def apply_view_counts(counts, batch_size=500):
+    items = sorted(counts.items())
+    for i in range(0, len(items), batch_size):
+        batch = items[i:i + batch_size]
+        RentalItem.objects.filter(pk__in=[pk for pk, _ in batch]).update(views=F('views') + Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in batch],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        ))
+        record_views(dict(batch))
+
+config = getattr(settings, 'VIEW_COUNTER', {})
+
+def default_store():
+    if config.get('BACKEND', 'redis') == 'redis':
+        try:
+            from django_redis import get_redis_connection
+            return RedisViewCounter(get_redis_connection('default'))
+        except (ImportError, NotImplementedError):
+            pass
+    return LocalViewCounter()
+
+view_counter = ViewCounter(
+    default_store(),
+    batch_size=config.get('BATCH_SIZE', 500),
+    flush_interval=config.get('FLUSH_INTERVAL', 30.0),
+    retry_interval=config.get('RETRY_INTERVAL', 5.0),
+)
+# Counts held in Redis outlive the process; only in-process counts need saving on exit.
+atexit.register(view_counter.flush, local_only=True)
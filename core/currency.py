@@ -0,0 +1,57 @@
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from .cache import LocalLRU, TieredCache
+from .models import ExchangeRate
+
+CENT = Decimal('0.01')
+VERSION_KEY = 'currency:rates:version'
+
+config = getattr(settings, 'CURRENCY_RATES', {})
+PIVOT = config.get('PIVOT', 'USD')
+rate_cache = TieredCache(LocalLRU(maxsize=8, ttl=config.get('LOCAL_TTL', 60)), timeout=config.get('TIMEOUT', 3600))
+
+def load_rates():
+    # Stored rows win; currencies without one fall back to the pivot row of the static matrix.
+    rates = {currency: Decimal(str(rate)) for currency, rate in settings.EXCHANGE_RATES.get(PIVOT, {}).items()}
+    rates.update(ExchangeRate.objects.values_list('currency', 'rate'))
+    rates[PIVOT] = Decimal(1)
+    return rates
+
+def rates_version():
+    # A fresh version whenever the key is missing, so a table cached under an older
+    # version can never be picked up again.
+    return rate_cache.get_or_set(VERSION_KEY, time.time_ns)
+
+def bump_rates_version():
+    rate_cache.delete_many([VERSION_KEY])
+
+def rate_table():
+    return rate_cache.get_or_set(f'currency:rates:{rates_version()}', load_rates)
+
+def rate(source, target, table=None):
+    if source == target:
+        return Decimal(1)
+    table = table or rate_table()
+    # Cross rates go through the pivot: source -> pivot -> target.
+    return table[target] / table[source]
+
+def convert(amount, source, target):
+    return (Decimal(amount) * rate(source, target)).quantize(CENT, ROUND_HALF_UP)
+
+def convert_many(items, target, amount='base_price', currency='base_currency'):
+    table = rate_table()
+    rates = {}
+    converted = []
+    for item in items:
+        source = getattr(item, currency)
+        if source not in rates:
+            rates[source] = rate(source, target, table)
+        converted.append((getattr(item, amount) * rates[source]).quantize(CENT, ROUND_HALF_UP))
+    return converted
+
+def with_prices(items, target, attr='converted_price', **fields):
+    items = list(items)
+    for item, price in zip(items, convert_many(items, target, **fields)):
+        setattr(item, attr, price)
+    return items
@@ -0,0 +1,103 @@
+import atexit
+import logging
+import os
+import random
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction, IntegrityError
+from django.utils import timezone
+from .models import UserAction
+
+logger = logging.getLogger(__name__)
+
+class ActionBuffer:
+    def __init__(self, batch_size=100, flush_interval=5.0, max_pending=5000, sample_rates=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.sample_rates = sample_rates or {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.pending = []
+        self.sampled_out = 0
+        self.failed = 0
+        self.worker = None
+        self.worker_pid = None
+
+    def record(self, user, action, details=None):
+        rate = self.sample_rates.get(action, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled_out += 1
+            return
+        entry = UserAction(user_id=user.pk if user else None, action=action, details=details or {}, timestamp=timezone.now())
+        with self.lock:
+            self.pending.append(entry)
+            size = len(self.pending)
+        if size >= self.max_pending:
+            # Backpressure: once the worker falls this far behind, the caller pays for the write.
+            self.flush()
+        elif size >= self.batch_size:
+            self.wake.set()
+        self.ensure_worker()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        try:
+            UserAction.objects.bulk_create(batch, batch_size=self.batch_size)
+        except IntegrityError:
+            # One bad row (e.g. its user was deleted since) fails the whole INSERT.
+            return self.write_each(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception('Dropped %d user actions', len(batch))
+            return 0
+        return len(batch)
+
+    def write_each(self, batch):
+        written = 0
+        for entry in batch:
+            try:
+                with transaction.atomic():
+                    entry.save(force_insert=True)
+                written += 1
+            except IntegrityError:
+                entry.pk = None
+                self.failed += 1
+        if written < len(batch):
+            logger.warning('Dropped %d user actions that failed integrity checks', len(batch) - written)
+        return written
+
+    def ensure_worker(self):
+        # Re-spawn after a fork: the parent's thread does not exist in the child.
+        if self.worker_pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.lock:
+            if self.worker_pid == os.getpid() and self.worker.is_alive():
+                return
+            self.worker = threading.Thread(target=self.run, name='action-buffer', daemon=True)
+            self.worker_pid = os.getpid()
+            self.worker.start()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+config = getattr(settings, 'ACTION_PIPELINE', {})
+buffer = ActionBuffer(
+    batch_size=config.get('BATCH_SIZE', 100),
+    flush_interval=config.get('FLUSH_INTERVAL', 5.0),
+    max_pending=config.get('MAX_PENDING', 5000),
+    sample_rates=config.get('SAMPLE_RATES'),
+)
+atexit.register(buffer.flush)
+
+def record_action(user, action, details=None):
+    buffer.record(user, action, details)
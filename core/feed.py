@@ -0,0 +1,49 @@
+from django.db.models import Q, Prefetch
+from django.utils.dateparse import parse_datetime
+from .models import RentalItem, SocialPost, Comment
+from .cache import listing_cache
+from .recommendations import recommended_items
+
+TOP_RATED_TIMEOUT = 300
+RECOMMENDED_TIMEOUT = 600
+INLINE_COMMENTS = 3
+COMMENT_PAGE_SIZE = 20
+
+def feed_queryset():
+    latest_comments = Comment.objects.select_related('user').order_by('-created_at', '-id')[:INLINE_COMMENTS]
+    return SocialPost.objects.select_related('user', 'item').prefetch_related(
+        Prefetch('comments', queryset=latest_comments, to_attr='latest_comments'),
+    ).order_by('-created_at', '-id')
+
+def encode_cursor(obj, field='created_at'):
+    return f'{getattr(obj, field).isoformat()}_{obj.pk}'
+
+def decode_cursor(cursor):
+    created_at, _, pk = (cursor or '').rpartition('_')
+    created_at = parse_datetime(created_at.replace(' ', '+')) if created_at else None
+    if created_at is None or not pk.isdigit():
+        return None
+    return created_at, int(pk)
+
+def keyset_page(queryset, cursor, page_size, field='created_at'):
+    # The queryset must be ordered by (-field, -id).
+    position = decode_cursor(cursor)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1], field) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+def top_rated(item_type, limit=6):
+    return listing_cache.get_or_set(
+        f'feed:top:{item_type}:{limit}',
+        lambda: list(RentalItem.objects.filter(type=item_type, verified=True).order_by('-rating')[:limit]),
+        TOP_RATED_TIMEOUT,
+    )
+
+def recommended_for(user, limit=4):
+    def compute():
+        # Users without precomputed recommendations yet get the top-rated listings.
+        return recommended_items(user, limit) or [item for item in top_rated('item') if item.owner_id != user.pk][:limit]
+    return listing_cache.get_or_set(f'feed:recommended:{user.pk}:{limit}', compute, RECOMMENDED_TIMEOUT)
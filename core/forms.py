@@ -64,12 +64,15 @@ class ReservationForm(forms.ModelForm):
 class RentalItemForm(forms.ModelForm):
     class Meta:
         model = RentalItem
-        fields = ['type', 'title', 'description', 'base_price', 'base_currency', 'image']
+        # Files go last: an upload rejected mid-body stops parsing of every field after it.
+        fields = ['type', 'title', 'description', 'base_price', 'base_currency', 'latitude', 'longitude', 'image']
         widgets = {
             'description': forms.Textarea(attrs={'class': 'form-input', 'rows': 4}),
             'type': forms.Select(attrs={'class': 'form-input'}),
             'base_currency': forms.Select(attrs={'class': 'form-input'}),
             'base_price': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
+            'latitude': forms.NumberInput(attrs={'class': 'form-input', 'step': 'any'}),
+            'longitude': forms.NumberInput(attrs={'class': 'form-input', 'step': 'any'}),
             'image': forms.FileInput(attrs={'class': 'form-input'}),
         }
 
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils.translation import gettext as _
+from notifications.notify import notify
+from .cache import LocalLRU, MISSING
+from .models import UserProfile, Badge, UserBadge
+
+# The badge table is a handful of rows that almost never change, so every process keeps a
+# copy. Badge edits clear it locally; other processes pick them up within BADGE_CACHE_TTL.
+badge_cache = LocalLRU(maxsize=1, ttl=getattr(settings, 'BADGE_CACHE_TTL', 300))
+
+def all_badges():
+    badges = badge_cache.get('badges')
+    if badges is MISSING:
+        badges = list(Badge.objects.order_by('points_required', 'id'))
+        badge_cache.set('badges', badges)
+    return badges
+
+def clear_badge_cache():
+    badge_cache.delete_many(['badges'])
+
+def award_points(user, points, action, request=None):
+    with transaction.atomic():
+        if not UserProfile.objects.filter(user=user).update(points=F('points') + points):
+            return []
+        total = UserProfile.objects.filter(user=user).values_list('points', flat=True).get()
+        # Only badges whose threshold this credit crossed; anything older is the backfill's job.
+        earned = [badge for badge in all_badges() if total - points < badge.points_required <= total]
+        UserBadge.objects.bulk_create([UserBadge(user=user, badge=badge) for badge in earned], ignore_conflicts=True)
+    if earned:
+        transaction.on_commit(lambda: announce_badges(user, earned, request))
+    return earned
+
+def announce_badges(user, badges, request=None):
+    for badge in badges:
+        text = _('Badge earned: %(name)s!') % {'name': badge.name}
+        if request is not None:
+            messages.success(request, text)
+        else:
+            notify(user.pk, 'badge', text, url=reverse('profile'))
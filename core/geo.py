@@ -0,0 +1,109 @@
+import math
+from functools import reduce
+from operator import or_
+from django.db.models import Q, F, Value, FloatField
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+RADIUS_CHOICES = (1, 5, 10, 25, 50, 100)
+# Upper bound on the cells one radius query is pruned to; more cells means a finer
+# precision and fewer rows reaching the exact distance check.
+MAX_CELLS = 32
+
+def parse_point(lat, lng):
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    return (lat, lng) if -90 <= lat <= 90 and -180 <= lng <= 180 else None
+
+def parse_radius(value):
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RADIUS_KM
+    return min(radius, MAX_RADIUS_KM) if radius > 0 else DEFAULT_RADIUS_KM
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+def cell_size(precision):
+    # Degrees of latitude and longitude covered by one cell; longitude gets the odd bit.
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+def successor(prefix):
+    # Smallest string greater than every geohash starting with prefix, or None at the end.
+    while prefix and prefix[-1] == BASE32[-1]:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + BASE32[BASE32.index(prefix[-1]) + 1]
+
+def bounding_box(lat, lng, radius_km):
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 360.0 if cos_lat < 1e-9 else min(360.0, dlat / cos_lat)
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng
+
+def covering_cells(lat, lng, radius_km, max_cells=MAX_CELLS):
+    # The finest set of geohash cells covering the circle's bounding box within max_cells.
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius_km)
+    best = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(precision)
+        rows = range(math.floor((lat_min + 90) / height), min(math.floor((lat_max + 90) / height), round(180 / height) - 1) + 1)
+        columns = range(math.floor((lng_min + 180) / width), math.floor((lng_max + 180) / width) + 1)
+        if len(rows) * min(len(columns), round(360 / width)) > max_cells:
+            break
+        best = {
+            encode(-90 + (r + 0.5) * height, ((c % round(360 / width)) + 0.5) * width - 180, precision)
+            for r in rows for c in columns
+        }
+    return sorted(best) if best is not None else None
+
+def cell_filter(cell):
+    upper = successor(cell)
+    return Q(geohash__gte=cell, geohash__lt=upper) if upper else Q(geohash__gte=cell)
+
+def distance_km(lat, lng):
+    # Haversine distance from (lat, lng) in plain SQL functions, so it runs on SQLite and
+    # PostgreSQL alike without a spatial extension.
+    lat_r, lng_r = math.radians(lat), math.radians(lng)
+    haversine = (
+        Power(Sin((Radians(F('latitude')) - Value(lat_r)) / 2), 2)
+        + Value(math.cos(lat_r)) * Cos(Radians(F('latitude'))) * Power(Sin((Radians(F('longitude')) - Value(lng_r)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(haversine), output_field=FloatField())
+
+def nearby(queryset, lat, lng, radius_km):
+    cells = covering_cells(lat, lng, radius_km)
+    if cells:
+        queryset = queryset.filter(reduce(or_, map(cell_filter, cells)))
+    else:
+        queryset = queryset.exclude(geohash='')
+    lat_min, lat_max, _, _ = bounding_box(lat, lng, radius_km)
+    return queryset.filter(latitude__range=(lat_min, lat_max)).annotate(distance=distance_km(lat, lng)).filter(distance__lte=radius_km)
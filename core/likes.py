@@ -0,0 +1,35 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from .models import SocialPost
+
+Like = SocialPost.likes.through
+
+# The through table's unique (socialpost, user) constraint doubles as the lookup index, so
+# every call here touches one row instead of loading the post's likers.
+
+def has_liked(user, post_id):
+    return Like.objects.filter(socialpost_id=post_id, user_id=user.pk).exists()
+
+def like(user, post_id):
+    try:
+        with transaction.atomic():
+            Like.objects.create(socialpost_id=post_id, user_id=user.pk)
+            SocialPost.objects.filter(pk=post_id).update(like_count=F('like_count') + 1)
+    except IntegrityError:
+        return False
+    return True
+
+@transaction.atomic
+def unlike(user, post_id):
+    deleted, _ = Like.objects.filter(socialpost_id=post_id, user_id=user.pk).delete()
+    if deleted:
+        SocialPost.objects.filter(pk=post_id).update(like_count=F('like_count') - deleted)
+    return bool(deleted)
+
+def like_count(post_id):
+    return SocialPost.objects.filter(pk=post_id).values_list('like_count', flat=True).first() or 0
+
+def liked_post_ids(user, post_ids):
+    if not user.is_authenticated:
+        return set()
+    return set(Like.objects.filter(user_id=user.pk, socialpost_id__in=post_ids).values_list('socialpost_id', flat=True))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from core.models import UserProfile, Badge, UserBadge
+
+class Command(BaseCommand):
+    help = 'Award every badge each user has the points for but is missing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        badges = list(Badge.objects.order_by('points_required'))
+        if not badges:
+            self.stdout.write('No badges defined.')
+            return
+        awarded = 0
+        last_pk = 0
+        batch_size = options['batch_size']
+        lowest = badges[0].points_required
+        while True:
+            profiles = list(
+                UserProfile.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'user_id', 'points')[:batch_size]
+            )
+            if not profiles:
+                break
+            last_pk = profiles[-1][0]
+            eligible = {user_id: points for _, user_id, points in profiles if points >= lowest}
+            held = set(UserBadge.objects.filter(user_id__in=eligible).values_list('user_id', 'badge_id'))
+            missing = [
+                UserBadge(user_id=user_id, badge=badge)
+                for user_id, points in eligible.items()
+                for badge in badges
+                if badge.points_required <= points and (user_id, badge.pk) not in held
+            ]
+            UserBadge.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+            awarded += len(missing)
+        self.stdout.write(self.style.SUCCESS(f'Awarded {awarded} badges.'))
@@ -0,0 +1,118 @@
+import json
+import platform
+import statistics
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.models import RentalItem, Message
+from .seed_benchmark import PREFIX
+
+class Command(BaseCommand):
+    help = 'Measure query counts and p50/p95 latency of the core views against seeded data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=f'{PREFIX}user_0', help='Account the requests are made as.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--compare', help='Baseline JSON from an earlier run; fail on regressions.')
+        parser.add_argument('--latency-threshold', type=float, default=0.25, help='Allowed relative p95 slowdown.')
+        parser.add_argument('--query-threshold', type=int, default=0, help='Allowed extra queries per request.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found; run seed_benchmark first.")
+        scenarios = self.scenarios(user)
+        # Rate limiting would start rejecting a benchmark run part-way through.
+        middleware = [m for m in settings.MIDDLEWARE if not m.endswith('RateLimitMiddleware')]
+        with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['*']):
+            client = Client()
+            client.force_login(user)
+            results = {name: self.measure(client, url, options['iterations'], options['warmup']) for name, url in scenarios}
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        for name, result in results.items():
+            self.stdout.write(f"{name:10} status={result['status']} queries={result['queries']} p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms")
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline['results'], results, options['latency_threshold'], options['query_threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def scenarios(self, user):
+        item = (
+            RentalItem.objects.filter(verified=True, owner__username__startswith=PREFIX)
+            .annotate(periods=Count('booked_periods')).order_by('-periods', 'pk').first()
+        )
+        if item is None:
+            raise CommandError('No seeded listings found; run seed_benchmark first.')
+        partner = (
+            Message.objects.filter(receiver=user).values('sender')
+            .annotate(n=Count('id')).order_by('-n').values_list('sender', flat=True).first()
+        )
+        scenarios = [
+            ('home', reverse('home')),
+            ('search', reverse('search') + '?q=' + item.title.split()[0]),
+            ('listing', reverse('listing', args=[item.pk])),
+            ('booking', reverse('booking', args=[item.pk])),
+            ('dashboard', reverse('dashboard')),
+        ]
+        if partner:
+            scenarios.append(('chat', reverse('chat', args=[partner])))
+        return scenarios
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        timings, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+            statuses.add(response.status_code)
+        return {
+            'url': url,
+            'status': sorted(statuses)[-1],
+            'queries': max(queries),
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 95),
+        }
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+def compare(baseline, current, latency_threshold, query_threshold):
+    regressions = []
+    for name, before in baseline.items():
+        after = current.get(name)
+        if after is None:
+            continue
+        if after['status'] != before['status']:
+            regressions.append(f"{name}: status {before['status']} -> {after['status']}")
+        if after['queries'] > before['queries'] + query_threshold:
+            regressions.append(f"{name}: queries {before['queries']} -> {after['queries']}")
+        if after['p95_ms'] > before['p95_ms'] * (1 + latency_threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f}ms -> {after['p95_ms']:.1f}ms")
+    return regressions
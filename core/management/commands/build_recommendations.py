@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.recommendations import build, BLOCK_SIZE
+
+class Command(BaseCommand):
+    help = 'Recompute listing similarities and per-user recommendations touched by activity since the last build.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every listing and user.')
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+
+    def handle(self, *args, **options):
+        result = build(full=options['full'], block_size=options['block_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated neighbours for {result['items']} listings and recommendations for {result['users']} users."))
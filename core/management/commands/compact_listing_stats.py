@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.analytics import compact
+from core.counters import view_counter
+
+class Command(BaseCommand):
+    help = 'Rebuild recent daily listing stats from reservations and reviews and drop empty rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        view_counter.flush()
+        today = timezone.localdate()
+        corrected = removed = 0
+        for offset in range(options['days']):
+            fixed, dropped = compact(today - timedelta(days=offset))
+            corrected += fixed
+            removed += dropped
+        self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} rows, removed {removed} empty rows.'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.counters import view_counter
+
+class Command(BaseCommand):
+    help = 'Write pending listing view counts to the database.'
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} views.'))
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from core.media import media_pipeline, needs_variants, is_image, variants_field, MEDIA_FIELDS
+
+class Command(BaseCommand):
+    help = 'Generate resized image variants for uploads that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist.')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(options['workers']) as pool:
+            for model, field in MEDIA_FIELDS.items():
+                generated = 0
+                last_pk = 0
+                while True:
+                    rows = list(
+                        model.objects.filter(pk__gt=last_pk).exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                        .order_by('pk').only('id', field, variants_field(field))[:options['batch_size']]
+                    )
+                    if not rows:
+                        break
+                    last_pk = rows[-1].pk
+                    pending = [
+                        row.pk for row in rows
+                        if (options['force'] and is_image(getattr(row, field).name)) or needs_variants(row, field)
+                    ]
+                    generated += sum(pool.map(lambda pk: media_pipeline.run(model, pk, field, options['force']), pending))
+                self.stdout.write(f'{model.__name__}.{field}: generated variants for {generated} files')
+        self.stdout.write(self.style.SUCCESS('Media variants generated.'))
@@ -0,0 +1,24 @@
+import json
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.currency import PIVOT
+from core.models import ExchangeRate
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from a JSON file mapping currency codes to units per pivot currency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path']) as f:
+                rates = {code.upper(): Decimal(str(rate)) for code, rate in json.load(f).items()}
+        except (OSError, ValueError, ArithmeticError) as e:
+            raise CommandError(f'Could not read rates: {e}')
+        rates[PIVOT] = Decimal(1)
+        with transaction.atomic():
+            for code, rate in rates.items():
+                ExchangeRate.objects.update_or_create(currency=code, defaults={'rate': rate})
+        self.stdout.write(self.style.SUCCESS(f'Loaded {len(rates)} rates against {PIVOT}.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.models import RentalItem
+from core.search import search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the listing search index from scratch in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        backend.rebuild(RentalItem.objects.order_by('id'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {type(backend).__name__} index for {RentalItem.objects.count()} listings.'))
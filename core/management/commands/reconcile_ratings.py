@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from core.models import RentalItem, UserProfile, Review
+
+class Command(BaseCommand):
+    help = 'Recompute rating totals for listings and profiles from their reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model, field in ((RentalItem, 'item_id'), (UserProfile, 'profile_id')):
+            fixed = self.reconcile(model, field, options['batch_size'])
+            self.stdout.write(f'{model.__name__}: corrected {fixed} rows')
+        self.stdout.write(self.style.SUCCESS('Ratings reconciled.'))
+
+    def reconcile(self, model, field, batch_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('id', 'rating', 'rating_sum', 'review_count')[:batch_size])
+            if not rows:
+                return fixed
+            last_pk = rows[-1].pk
+            totals = {
+                row[field]: (row['total'], row['count'])
+                for row in Review.objects.filter(**{f'{field}__in': [r.pk for r in rows]}).values(field).annotate(total=Sum('rating'), count=Count('id'))
+            }
+            changed = []
+            for row in rows:
+                total, count = totals.get(row.pk, (0, 0))
+                rating = total / count if count else 0.0
+                if (row.rating_sum, row.review_count) != (total, count) or abs(row.rating - rating) > 1e-9:
+                    row.rating_sum, row.review_count, row.rating = total, count, rating
+                    changed.append(row)
+            model.objects.bulk_update(changed, ['rating_sum', 'review_count', 'rating'])
+            fixed += len(changed)
@@ -0,0 +1,120 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import RentalItem, Reservation, BookedPeriod, SocialPost, Comment, UserProfile, Message, conversation_key
+from core.search import search_backend
+
+PREFIX = 'bench_'
+WORDS = ['tent', 'camera', 'bike', 'drill', 'kayak', 'projector', 'ladder', 'guitar', 'cleaning', 'tutoring',
+         'plumbing', 'catering', 'photography', 'delivery', 'garden', 'portable', 'vintage', 'family', 'pro', 'compact']
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible data set for the benchmark command. Seeded users are named bench_*.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--items', type=int, default=500)
+        parser.add_argument('--booked-periods', type=int, default=60, help='Booked periods per listing.')
+        parser.add_argument('--posts', type=int, default=300)
+        parser.add_argument('--likes', type=int, default=50, help='Likes per post.')
+        parser.add_argument('--comments', type=int, default=20, help='Comments per post.')
+        parser.add_argument('--chats', type=int, default=5, help='Conversations for the first seeded user.')
+        parser.add_argument('--chat-length', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--reset', action='store_true', help='Delete previously seeded data first.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if options['reset']:
+            deleted, _ = User.objects.filter(username__startswith=PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} seeded rows.')
+        with transaction.atomic():
+            users = self.seed_users(options['users'])
+            items = self.seed_items(rng, users, options['items'])
+            self.seed_bookings(rng, users, items, options['booked_periods'])
+            self.seed_posts(rng, users, items, options['posts'], options['likes'], options['comments'])
+            self.seed_chats(rng, users, options['chats'], options['chat_length'])
+            search_backend().index(items)
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(users)} users and {len(items)} listings; benchmark as {users[0].username}.'))
+
+    def seed_users(self, count):
+        start = User.objects.filter(username__startswith=PREFIX).count()
+        users = User.objects.bulk_create(
+            [User(username=f'{PREFIX}user_{i}', email=f'{PREFIX}user_{i}@example.com') for i in range(start, start + count)],
+            batch_size=self.batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, phone_number=f'+{900000000000 + user.pk}', currency='KES') for user in users],
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def seed_items(self, rng, users, count):
+        items = []
+        for i in range(count):
+            words = rng.sample(WORDS, 3)
+            items.append(RentalItem(
+                owner=rng.choice(users),
+                type='service' if i % 4 == 0 else 'item',
+                title=' '.join(words).title(),
+                description=' '.join(rng.choices(WORDS, k=30)),
+                base_price=Decimal(rng.randint(100, 50000)) / 100,
+                base_currency=rng.choice(['KES', 'USD', 'EUR', 'GBP']),
+                pricing_rules={'weekend': 1.2, 'length_discounts': {'7': 0.9}} if i % 3 == 0 else {},
+                verified=i % 10 != 0,
+                rating=round(rng.uniform(0, 5), 2),
+                views=rng.randint(0, 5000),
+            ))
+        return RentalItem.objects.bulk_create(items, batch_size=self.batch_size)
+
+    def seed_bookings(self, rng, users, items, per_item):
+        now = timezone.now()
+        reservations = []
+        for item in items:
+            day = rng.randint(0, 3)
+            for _ in range(per_item):
+                start = now + timedelta(days=day)
+                end = start + timedelta(days=rng.randint(1, 3))
+                day += (end - start).days + rng.randint(0, 4)
+                reservations.append(Reservation(
+                    renter=rng.choice(users), item=item, start_date=start, end_date=end,
+                    total_cost=item.base_price, contract_agreed=True, status='confirmed',
+                ))
+        reservations = Reservation.objects.bulk_create(reservations, batch_size=self.batch_size)
+        BookedPeriod.objects.bulk_create(
+            [BookedPeriod(item=r.item, reservation=r, start=r.start_date, end=r.end_date) for r in reservations],
+            batch_size=self.batch_size,
+        )
+
+    def seed_posts(self, rng, users, items, count, likes, comments):
+        now = timezone.now()
+        posts = SocialPost.objects.bulk_create([
+            SocialPost(user=rng.choice(users), item=rng.choice(items), caption=' '.join(rng.choices(WORDS, k=12)),
+                       like_count=min(likes, len(users)), comment_count=comments)
+            for _ in range(count)
+        ], batch_size=self.batch_size)
+        Like = SocialPost.likes.through
+        Like.objects.bulk_create(
+            [Like(socialpost=post, user=user) for post in posts for user in rng.sample(users, min(likes, len(users)))],
+            batch_size=self.batch_size,
+        )
+        Comment.objects.bulk_create([
+            Comment(post=post, user=rng.choice(users), text=' '.join(rng.choices(WORDS, k=8)), created_at=now - timedelta(minutes=n))
+            for post in posts for n in range(comments)
+        ], batch_size=self.batch_size)
+
+    def seed_chats(self, rng, users, chats, length):
+        me = users[0]
+        messages = []
+        for other in users[1:chats + 1]:
+            for n in range(length):
+                sender, receiver = (me, other) if rng.random() < 0.5 else (other, me)
+                messages.append(Message(sender=sender, receiver=receiver, conversation=conversation_key(me.pk, other.pk),
+                                        content=' '.join(rng.choices(WORDS, k=10)), read=n < length - 10))
+        Message.objects.bulk_create(messages, batch_size=self.batch_size)
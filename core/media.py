@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+from .metrics import registry
+from .models import RentalItem, SocialPost, Reservation
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+FORMATS = (('webp', 'WEBP'), ('jpeg', 'JPEG'))
+MEDIA_FIELDS = {RentalItem: 'image', SocialPost: 'media', Reservation: 'payment_proof'}
+
+def variants_field(field):
+    return f'{field}_variants'
+
+def is_image(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+def needs_variants(instance, field):
+    file = getattr(instance, field)
+    return bool(file) and is_image(file.name) and getattr(instance, variants_field(field)).get('source') != file.name
+
+def render_variants(file, sizes, quality):
+    # Variants are re-encoded from pixels only, so EXIF (GPS, camera, orientation) never
+    # reaches them; orientation is applied to the pixels first.
+    with file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    base = os.path.splitext(file.name)[0]
+    variants = {'source': file.name}
+    previous = None
+    for name, size in sorted(sizes.items(), key=lambda entry: entry[1]):
+        if previous and previous['width'] == image.width and previous['height'] == image.height:
+            # The original is smaller than this size too; never upscale, reuse the files.
+            variants[name] = previous
+            continue
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for key, encoder in FORMATS:
+            frame = resized
+            if encoder == 'JPEG' and resized.mode == 'RGBA':
+                frame = Image.new('RGB', resized.size, 'white')
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            frame.save(buffer, encoder, quality=quality)
+            entry[key] = file.storage.save(f'{base}.{name}.{key}', ContentFile(buffer.getvalue()))
+        variants[name] = previous = entry
+    return variants
+
+def process(model, pk, field, sizes, quality, force=False):
+    instance = model.objects.filter(pk=pk).only(field, variants_field(field)).first()
+    file = getattr(instance, field, None)
+    if not file or not is_image(file.name) or not (force or needs_variants(instance, field)):
+        return False
+    variants = render_variants(file, sizes, quality)
+    # Only attach the variants if the same upload is still current. Variant files are
+    # content-addressed like their source and may be shared, so none are deleted here.
+    return bool(model.objects.filter(pk=pk, **{field: file.name}).update(**{variants_field(field): variants}))
+
+class MediaPipeline:
+    def __init__(self, sizes, quality=80, workers=2):
+        self.sizes = sizes
+        self.quality = quality
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = None
+        self.worker_pid = None
+
+    def ensure_executor(self):
+        # A forked child does not inherit the parent's worker threads.
+        if self.worker_pid == os.getpid():
+            return self.executor
+        with self.lock:
+            if self.worker_pid != os.getpid():
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='media')
+                self.worker_pid = os.getpid()
+        return self.executor
+
+    def submit(self, model, pk, field):
+        return self.ensure_executor().submit(self.run, model, pk, field)
+
+    def run(self, model, pk, field, force=False):
+        try:
+            done = process(model, pk, field, self.sizes, self.quality, force)
+            registry.incr('media_variants_total', outcome='generated' if done else 'skipped')
+            return done
+        except Exception:
+            registry.incr('media_variants_total', outcome='failed')
+            logger.exception('Generating variants for %s %s failed', model.__name__, pk)
+            return False
+        finally:
+            close_old_connections()
+
+config = getattr(settings, 'MEDIA_PIPELINE', {})
+media_pipeline = MediaPipeline(
+    config.get('SIZES', {'thumb': 160, 'card': 480, 'full': 1600}),
+    quality=config.get('QUALITY', 80),
+    workers=config.get('WORKERS', 2),
+)
+
+def queue_variants(instance, field):
+    if needs_variants(instance, field):
+        model, pk = type(instance), instance.pk
+        transaction.on_commit(lambda: media_pipeline.submit(model, pk, field))
@@ -0,0 +1,69 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Per-request tallies filled in by instrumented code while the profiler samples a request.
+request_stats = ContextVar('request_stats', default=None)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.histograms = {}
+
+    def incr(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += amount
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self):
+        # Prometheus text exposition format.
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(h.counts), h.buckets, h.total, h.count) for key, h in self.histograms.items())
+        lines = []
+        for (name, labels), value in counters:
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), counts, buckets, total, count in histograms:
+            cumulative = 0
+            for bound, n in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total:.3f}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+registry = Registry()
+
+def track(name, amount=1):
+    stats = request_stats.get()
+    if stats is not None:
+        stats[name] += amount
@@ -1,13 +1,92 @@
-from django.core.cache import cache
-from django.http import HttpResponseTooManyRequests
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
 from django.utils.deprecation import MiddlewareMixin
+from .ratelimit import limiter
+from .metrics import registry, request_stats
+
+logger = logging.getLogger('core.profiling')
+
+class QueryBudgetExceeded(Exception):
+    pass
 
 class RateLimitMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        ip = request.META.get('REMOTE_ADDR')
-        key = f"ratelimit:{ip}"
-        requests = cache.get(key, 0)
-        if requests >= 100:  # 100 requests per minute
-            return HttpResponseTooManyRequests("Too many requests")
-        cache.set(key, requests + 1, 60)
-        return None
\ No newline at end of file
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        policy = limiter.policy_for(request.resolver_match.url_name)
+        if request.user.is_authenticated:
+            identity = f'user:{request.user.pk}'
+        else:
+            identity = f"ip:{request.META.get('REMOTE_ADDR')}"
+        allowed, remaining, reset = limiter.hit(policy, identity)
+        request.ratelimit = (policy.limit, remaining, reset)
+        if not allowed:
+            response = HttpResponse("Too many requests", status=429)
+            response['Retry-After'] = reset
+            return response
+        return None
+
+    def process_response(self, request, response):
+        if hasattr(request, 'ratelimit'):
+            limit, remaining, reset = request.ratelimit
+            response['X-RateLimit-Limit'] = limit
+            response['X-RateLimit-Remaining'] = remaining
+            response['X-RateLimit-Reset'] = reset
+        return response
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = getattr(settings, 'PROFILING', {})
+        if random.random() >= config.get('SAMPLE_RATE', 0.0):
+            return self.get_response(request)
+        stats = Counter()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(SQLTimer(stats)))
+                response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        elapsed = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unresolved'
+        registry.observe('request_latency_ms', elapsed, view=view)
+        registry.observe('request_sql_queries', stats['queries'], view=view)
+        registry.observe('request_sql_ms', stats['sql_ms'], view=view)
+        registry.incr('cache_hits_total', stats['cache_hits'], view=view)
+        registry.incr('cache_misses_total', stats['cache_misses'], view=view)
+        logger.info(json.dumps({
+            'view': view, 'status': response.status_code, 'latency_ms': round(elapsed, 2), 'queries': stats['queries'],
+            'sql_ms': round(stats['sql_ms'], 2), 'cache_hits': stats['cache_hits'], 'cache_misses': stats['cache_misses'],
+        }))
+        budget = config.get('BUDGETS', {}).get(view)
+        if budget is not None and stats['queries'] > budget:
+            message = f"{view} ran {stats['queries']} queries, budget is {budget}"
+            if config.get('BUDGET_ACTION', 'log') == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+            registry.incr('query_budget_exceeded_total', view=view)
+        return response
+
+class SQLTimer:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats['queries'] += 1
+            self.stats['sql_ms'] += (time.perf_counter() - started) * 1000
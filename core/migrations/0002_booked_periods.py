@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:56
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_availability(apps, schema_editor):
+    RentalItem = apps.get_model('core', 'RentalItem')
+    BookedPeriod = apps.get_model('core', 'BookedPeriod')
+    periods = []
+    for item_id, availability in RentalItem.objects.exclude(availability={}).values_list('id', 'availability').iterator(chunk_size=500):
+        days = sorted(datetime.date.fromisoformat(d) for d, state in availability.items() if state == 'booked')
+        run_start = previous = None
+        for day in days + [None]:
+            if day is not None and previous is not None and day == previous + datetime.timedelta(days=1):
+                previous = day
+                continue
+            if run_start is not None:
+                periods.append(BookedPeriod(
+                    item_id=item_id,
+                    start=timezone.make_aware(datetime.datetime.combine(run_start, datetime.time.min)),
+                    end=timezone.make_aware(datetime.datetime.combine(previous + datetime.timedelta(days=1), datetime.time.min)),
+                ))
+            run_start = previous = day
+        if len(periods) >= 1000:
+            BookedPeriod.objects.bulk_create(periods)
+            periods = []
+    BookedPeriod.objects.bulk_create(periods)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_periods', to='core.rentalitem')),
+                ('reservation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booked_period', to='core.reservation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', 'end', 'start'], name='core_booked_item_end_idx')],
+            },
+        ),
+        migrations.RunPython(copy_availability, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='rentalitem',
+            name='availability',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_booked_periods'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalitem',
+            name='booking_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
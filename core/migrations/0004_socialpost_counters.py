@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    SocialPost = apps.get_model('core', 'SocialPost')
+    batch = []
+    for post in SocialPost.objects.annotate(likers=Count('likes')).only('id', 'comments').iterator(chunk_size=500):
+        post.like_count = post.likers
+        post.comment_count = len(post.comments)
+        batch.append(post)
+        if len(batch) >= 500:
+            SocialPost.objects.bulk_update(batch, ['like_count', 'comment_count'])
+            batch = []
+    SocialPost.objects.bulk_update(batch, ['like_count', 'comment_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_rentalitem_booking_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='socialpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='socialpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='socialpost',
+            index=models.Index(fields=['-created_at', '-id'], name='core_post_feed_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from core.search import SQLiteFTSBackend, PostgresSearchBackend
+
+
+def create_search_index(apps, schema_editor):
+    RentalItem = apps.get_model('core', 'RentalItem')
+    if schema_editor.connection.vendor == 'sqlite':
+        SQLiteFTSBackend().setup(schema_editor, RentalItem)
+    elif schema_editor.connection.vendor == 'postgresql':
+        PostgresSearchBackend().setup(schema_editor, RentalItem)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLiteFTSBackend.table}')
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PostgresSearchBackend.index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_socialpost_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
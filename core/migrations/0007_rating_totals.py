@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    Review = apps.get_model('core', 'Review')
+    for model_name, field in (('RentalItem', 'item_id'), ('UserProfile', 'profile_id')):
+        model = apps.get_model('core', model_name)
+        totals = Review.objects.exclude(**{field: None}).values(field).annotate(total=Sum('rating'), count=Count('id'))
+        for row in totals.iterator(chunk_size=1000):
+            model.objects.filter(pk=row[field]).update(rating_sum=row['total'], review_count=row['count'], rating=row['total'] / row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_useraction_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalitem',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating',
+            field=models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import datetime
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_comments(apps, schema_editor):
+    SocialPost = apps.get_model('core', 'SocialPost')
+    Comment = apps.get_model('core', 'Comment')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    posts = SocialPost.objects.exclude(legacy_comments=[]).only('id', 'legacy_comments').order_by('id')
+    chunk = []
+
+    def flush(chunk):
+        usernames = {c.get('user') for post in chunk for c in post.legacy_comments}
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        comments = []
+        for post in chunk:
+            migrated = 0
+            for c in post.legacy_comments:
+                if c.get('user') not in user_ids:
+                    continue
+                created_at = datetime.fromisoformat(c['date']) if c.get('date') else timezone.now()
+                if timezone.is_naive(created_at):
+                    created_at = timezone.make_aware(created_at)
+                comments.append(Comment(post_id=post.id, user_id=user_ids[c['user']], text=c.get('text', ''), created_at=created_at))
+                migrated += 1
+            post.comment_count = migrated
+        Comment.objects.bulk_create(comments, batch_size=1000)
+        SocialPost.objects.bulk_update(chunk, ['comment_count'])
+
+    for post in posts.iterator(chunk_size=200):
+        chunk.append(post)
+        if len(chunk) >= 200:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_rating_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='socialpost',
+            old_name='comments',
+            new_name='legacy_comments',
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(max_length=500)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.socialpost')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post', '-created_at', '-id'], name='core_comment_post_idx')],
+            },
+        ),
+        migrations.RunPython(copy_comments, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='socialpost',
+            name='legacy_comments',
+        ),
+    ]
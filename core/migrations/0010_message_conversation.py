@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Message = apps.get_model('core', 'Message')
+    batch = []
+    for message in Message.objects.only('id', 'sender_id', 'receiver_id').iterator(chunk_size=500):
+        low, high = sorted((message.sender_id, message.receiver_id))
+        message.conversation = f'{low}:{high}'
+        batch.append(message)
+        if len(batch) >= 500:
+            Message.objects.bulk_update(batch, ['conversation'])
+            batch = []
+    Message.objects.bulk_update(batch, ['conversation'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_userprofile_related_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.CharField(default='', editable=False, max_length=41),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-timestamp', '-id'], name='core_message_conv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('read', False)), fields=['receiver', 'conversation'], name='core_message_unread_idx'),
+        ),
+    ]
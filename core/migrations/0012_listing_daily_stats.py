@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    # Lifetime views predate daily tracking and are booked on each listing's creation day.
+    RentalItem = apps.get_model('core', 'RentalItem')
+    Reservation = apps.get_model('core', 'Reservation')
+    Review = apps.get_model('core', 'Review')
+    ListingDailyStats = apps.get_model('core', 'ListingDailyStats')
+    rows = {}
+
+    def row(item_id, owner_id, day):
+        key = (item_id, day)
+        if key not in rows:
+            rows[key] = ListingDailyStats(item_id=item_id, owner_id=owner_id, date=day)
+        return rows[key]
+
+    for item in RentalItem.objects.filter(views__gt=0).annotate(day=TruncDate('created_at')).values('id', 'owner_id', 'day', 'views'):
+        row(item['id'], item['owner_id'], item['day']).views = item['views']
+    reservations = Reservation.objects.exclude(status='canceled').annotate(day=TruncDate('created_at'))
+    for entry in reservations.values('item_id', 'item__owner_id', 'day').annotate(bookings=Count('id'), revenue=Sum('total_cost')):
+        stats = row(entry['item_id'], entry['item__owner_id'], entry['day'])
+        stats.bookings, stats.revenue = entry['bookings'], entry['revenue']
+    reviews = Review.objects.filter(item__isnull=False).annotate(day=TruncDate('created_at'))
+    for entry in reviews.values('item_id', 'item__owner_id', 'day').annotate(rating_sum=Sum('rating'), review_count=Count('id')):
+        stats = row(entry['item_id'], entry['item__owner_id'], entry['day'])
+        stats.rating_sum, stats.review_count = entry['rating_sum'], entry['review_count']
+    ListingDailyStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_exchange_rates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.rentalitem')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listing_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'date'], name='core_stats_owner_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'date'), name='core_stats_item_date_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
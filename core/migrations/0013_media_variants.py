@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_listing_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='payment_proof_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='socialpost',
+            name='media_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:28
+
+import core.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_media_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rentalitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='items/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='payment_proof',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='proofs/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='socialpost',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', validators=[django.core.validators.FileExtensionValidator(['mp4', 'jpg', 'jpeg', 'png'])]),
+        ),
+    ]
@@ -1,10 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, FileExtensionValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from .storage import content_storage
+from .geo import encode
 
 class UserProfile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     phone_number = models.CharField(max_length=15, unique=True)
     currency = models.CharField(max_length=3, default='USD')
     tier = models.CharField(max_length=10, choices=[('free', 'Free'), ('green', 'Green'), ('blue', 'Blue'), ('gold', 'Gold')], default='free')
@@ -13,6 +18,9 @@ class UserProfile(models.Model):
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=100, blank=True)
     points = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -27,18 +35,34 @@ class RentalItem(models.Model):
     details = models.JSONField(default=dict)
     base_currency = models.CharField(max_length=3, default='KES')
     base_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.01)])
-    pricing_rules = models.JSONField(default=dict)  # e.g., {'weekend': 1.2, 'peak': 1.5}
+    pricing_rules = models.JSONField(default=dict)  # see core.pricing.PricingRules for the format
     verified = models.BooleanField(default=False)
-    image = models.ImageField(upload_to='items/%Y/%m/%d/', null=True, blank=True, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])])
-    availability = models.JSONField(default=dict)
+    image = models.ImageField(upload_to='items/', storage=content_storage, null=True, blank=True, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])])
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # see core.media.render_variants
     rating = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])
+    rating_sum = models.PositiveIntegerField(default=0)
     review_count = models.PositiveIntegerField(default=0)
     views = models.PositiveIntegerField(default=0)
+    booking_version = models.PositiveIntegerField(default=0, editable=False)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90.0), MaxValueValidator(90.0)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180.0), MaxValueValidator(180.0)])
+    geohash = models.CharField(max_length=12, blank=True, editable=False)  # derived from the coordinates, see core.geo
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['geohash'], name='core_item_geohash_idx')]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        located = self.latitude is not None and self.longitude is not None
+        self.geohash = encode(self.latitude, self.longitude) if located else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
 class Reservation(models.Model):
     STATUS_CHOICES = [('pending', _('Pending')), ('confirmed', _('Confirmed')), ('completed', _('Completed')), ('canceled', _('Canceled'))]
     renter = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -46,7 +70,8 @@ class Reservation(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     total_cost = models.DecimalField(max_digits=10, decimal_places=2)
-    payment_proof = models.ImageField(upload_to='proofs/%Y/%m/%d/', null=True, blank=True, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])])
+    payment_proof = models.ImageField(upload_to='proofs/', storage=content_storage, null=True, blank=True, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])])
+    payment_proof_variants = models.JSONField(default=dict, blank=True, editable=False)  # see core.media.render_variants
     contract_agreed = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,18 +79,52 @@ class Reservation(models.Model):
     def __str__(self):
         return f"{self.renter.username} - {self.item.title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.status == 'canceled':
+            BookedPeriod.objects.filter(reservation=self).delete()
+
+class BookedPeriod(models.Model):
+    item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, related_name='booked_periods')
+    reservation = models.OneToOneField(Reservation, on_delete=models.CASCADE, null=True, blank=True, related_name='booked_period')
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['item', 'end', 'start'], name='core_booked_item_end_idx')]
+
+    def __str__(self):
+        return f"{self.item.title}: {self.start:%Y-%m-%d %H:%M} - {self.end:%Y-%m-%d %H:%M}"
+
 class SocialPost(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, null=True, blank=True)
-    media = models.FileField(upload_to='posts/%Y/%m/%d/', null=True, blank=True, validators=[FileExtensionValidator(['mp4', 'jpg', 'jpeg', 'png'])])
+    media = models.FileField(upload_to='posts/', storage=content_storage, null=True, blank=True, validators=[FileExtensionValidator(['mp4', 'jpg', 'jpeg', 'png'])])
+    media_variants = models.JSONField(default=dict, blank=True, editable=False)  # see core.media.render_variants
     caption = models.CharField(max_length=280)
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
-    comments = models.JSONField(default=list)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'], name='core_post_feed_idx')]
+
     def __str__(self):
         return self.caption[:50]
 
+class Comment(models.Model):
+    post = models.ForeignKey(SocialPost, on_delete=models.CASCADE, related_name='comments')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    text = models.TextField(max_length=500)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['post', '-created_at', '-id'], name='core_comment_post_idx')]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.text[:50]}"
+
 class Review(models.Model):
     reviewer = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, null=True, blank=True)
@@ -78,29 +137,60 @@ class Review(models.Model):
         unique_together = (('reviewer', 'item'), ('reviewer', 'profile'))
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.item:
-            reviews = Review.objects.filter(item=self.item)
-            self.item.rating = sum(r.rating for r in reviews) / reviews.count()
-            self.item.review_count = reviews.count()
-            self.item.save()
+        with transaction.atomic():
+            previous = None if self._state.adding else Review.objects.filter(pk=self.pk).values('rating', 'item_id', 'profile_id').first()
+            super().save(*args, **kwargs)
+            if previous:
+                apply_rating(previous['item_id'], previous['profile_id'], -previous['rating'], -1)
+            apply_rating(self.item_id, self.profile_id, self.rating, 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            apply_rating(self.item_id, self.profile_id, -self.rating, -1)
+        return result
+
+def apply_rating(item_id, profile_id, delta, count):
+    for model, pk in ((RentalItem, item_id), (UserProfile, profile_id)):
+        if pk is not None:
+            model.objects.filter(pk=pk).update(
+                rating_sum=F('rating_sum') + delta,
+                review_count=F('review_count') + count,
+                rating=Coalesce(Cast(F('rating_sum') + delta, models.FloatField()) / NullIf(F('review_count') + count, 0), 0.0),
+            )
 
 class UserAction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     action = models.CharField(max_length=100)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     details = models.JSONField(default=dict)
 
     def __str__(self):
         return f"{self.user.username if self.user else 'Anonymous'} - {self.action}"
 
+def conversation_key(user_id, other_id):
+    return f'{min(user_id, other_id)}:{max(user_id, other_id)}'
+
 class Message(models.Model):
     sender = models.ForeignKey(User, related_name='sent_messages', on_delete=models.CASCADE)
     receiver = models.ForeignKey(User, related_name='received_messages', on_delete=models.CASCADE)
+    # Same value for both directions of a conversation, so history is one index range scan.
+    conversation = models.CharField(max_length=41, editable=False)
     content = models.TextField(max_length=1000)
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='core_message_conv_idx'),
+            models.Index(fields=['receiver', 'conversation'], condition=models.Q(read=False), name='core_message_unread_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.conversation:
+            self.conversation = conversation_key(self.sender_id, self.receiver_id)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.sender.username} to {self.receiver.username}"
 
@@ -118,4 +208,52 @@ class UserBadge(models.Model):
     awarded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'badge')
\ No newline at end of file
+        unique_together = ('user', 'badge')
+
+class ItemSimilarity(models.Model):
+    # Top-K neighbours per listing, written by core.recommendations.build.
+    item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, related_name='similar')
+    neighbor = models.ForeignKey(RentalItem, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['item', 'neighbor'], name='core_similarity_pair_uniq')]
+        indexes = [models.Index(fields=['item', '-score'], name='core_similarity_item_idx')]
+
+class UserRecommendation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'item'], name='core_recommendation_uniq')]
+        indexes = [models.Index(fields=['user', '-score'], name='core_recommendation_user_idx')]
+
+class ListingDailyStats(models.Model):
+    item = models.ForeignKey(RentalItem, on_delete=models.CASCADE, related_name='daily_stats')
+    # Copied from the item so owner-wide rollups never have to join through listings.
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listing_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rating_sum = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['item', 'date'], name='core_stats_item_date_uniq')]
+        indexes = [models.Index(fields=['owner', 'date'], name='core_stats_owner_date_idx')]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.date}"
+
+class ExchangeRate(models.Model):
+    # Units of this currency per one unit of settings.CURRENCY_RATES['PIVOT'].
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(0.00000001)])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.currency}: {self.rate}"
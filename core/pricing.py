@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from math import ceil
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+ONE = Decimal(1)
+CENT = Decimal('0.01')
+MAX_QUOTE_RANGES = 100
+UNITS = {'item': ('day', timedelta(days=1)), 'service': ('hour', timedelta(hours=1))}
+# Any leap year: season boundaries are month/day pairs, and Feb 29 must exist.
+LEAP_YEAR = 2000
+
+class PricingRules:
+    # Rule format (all keys optional):
+    #   weekend: 1.2
+    #   peak: 1.5 with peak_dates: ['2025-12-24', ...], or peak: {'multiplier': 1.5, 'dates': [...]}
+    #   seasons: [{'start': '12-15', 'end': '01-10', 'multiplier': 1.3}, ...]
+    #   length_discounts: {'7': 0.9, '28': 0.75}  (units booked -> multiplier on the total)
+    def __init__(self, rules):
+        weekend = multiplier(rules.get('weekend', 1))
+        self.weekday = (ONE,) * 5 + (weekend,) * 2
+        self.seasons = {}
+        for season in rules.get('seasons', []):
+            factor = multiplier(season['multiplier'])
+            for day in season_days(season['start'], season['end']):
+                self.seasons[day] = self.seasons.get(day, ONE) * factor
+        peak = rules.get('peak', 1)
+        if isinstance(peak, dict):
+            peak, peak_dates = peak.get('multiplier', 1), peak.get('dates', [])
+        else:
+            peak_dates = rules.get('peak_dates', [])
+        self.peak = multiplier(peak)
+        self.peak_dates = {parse_iso_date(d) for d in peak_dates}
+        self.discounts = sorted(((int(units), multiplier(m)) for units, m in rules.get('length_discounts', {}).items()), reverse=True)
+
+    def day_factor(self, day):
+        factor = self.weekday[day.weekday()] * self.seasons.get((day.month, day.day), ONE)
+        if day in self.peak_dates:
+            factor *= self.peak
+        return factor
+
+    def discount(self, units):
+        for threshold, factor in self.discounts:
+            if units >= threshold:
+                return factor
+        return ONE
+
+def multiplier(value):
+    value = Decimal(str(value))
+    if value <= 0:
+        raise ValueError(f'Pricing multiplier must be positive, got {value}')
+    return value
+
+def parse_iso_date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date in pricing rules: {value!r}')
+    return parsed
+
+def season_days(start, end):
+    first = parse_iso_date(f'{LEAP_YEAR}-{start}')
+    last = parse_iso_date(f'{LEAP_YEAR}-{end}')
+    if last < first:
+        # Wraps over the new year.
+        last = last.replace(year=LEAP_YEAR + 1)
+    day = first
+    while day <= last:
+        yield (day.month, day.day)
+        day += timedelta(days=1)
+
+@lru_cache(maxsize=1024)
+def compile_canonical(canonical):
+    return PricingRules(json.loads(canonical))
+
+def compile_rules(rules):
+    # Keyed by content, so an edited rule set compiles afresh and identical ones share an evaluator.
+    return compile_canonical(json.dumps(rules or {}, sort_keys=True))
+
+def local_naive(value):
+    if isinstance(value, datetime):
+        return timezone.make_naive(value) if timezone.is_aware(value) else value
+    return datetime.combine(value, time.min)
+
+def units_per_day(start, units, step):
+    # (date, units starting on that date) for `units` consecutive steps from `start`, so a
+    # week of hourly units costs seven factor lookups rather than 168.
+    day = start.date()
+    midnight = datetime.combine(day + timedelta(days=1), time.min)
+    done = 0
+    while done < units:
+        n = min(units - done, ceil((midnight - (start + done * step)) / step))
+        yield day, n
+        done += n
+        day += timedelta(days=1)
+        midnight += timedelta(days=1)
+
+def quote(item, start, end, rules=None):
+    rules = rules or compile_rules(item.pricing_rules)
+    unit, step = UNITS.get(item.type, UNITS['item'])
+    start, end = local_naive(start), local_naive(end)
+    units = max(1, ceil((end - start) / step))
+    weighted = sum(n * rules.day_factor(day) for day, n in units_per_day(start, units, step))
+    subtotal = item.base_price * weighted
+    discount = rules.discount(units)
+    return {
+        'units': units,
+        'unit': unit,
+        'subtotal': subtotal.quantize(CENT, ROUND_HALF_UP),
+        'discount': discount,
+        'total': (subtotal * discount).quantize(CENT, ROUND_HALF_UP),
+    }
+
+def quote_many(item, ranges):
+    rules = compile_rules(item.pricing_rules)
+    return [quote(item, start, end, rules) for start, end in ranges]
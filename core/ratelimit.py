@@ -0,0 +1,99 @@
+import math
+import threading
+import time
+from django.conf import settings
+from .metrics import registry
+from .breaker import CircuitBreaker
+
+# Sliding-window counter: the previous fixed window is weighted by how much of it still
+# overlaps the sliding window. Check and increment happen in one round trip, and only
+# allowed requests are counted.
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = math.floor(previous * tonumber(ARGV[2]) + current)
+if used >= tonumber(ARGV[3]) then
+    return {0, used}
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1] * 2)
+end
+return {1, used + 1}
+"""
+
+class Policy:
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+def window_position(window, now):
+    index, offset = divmod(now, window)
+    return int(index), 1 - offset / window
+
+class RedisLimiter:
+    def __init__(self, client):
+        self.script = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key, policy, now):
+        index, weight = window_position(policy.window, now)
+        allowed, used = self.script(keys=[f'{key}:{index}', f'{key}:{index - 1}'], args=[policy.window, weight, policy.limit])
+        return bool(allowed), used
+
+class LocalLimiter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.next_prune = 0
+
+    def hit(self, key, policy, now):
+        index, weight = window_position(policy.window, now)
+        with self.lock:
+            if now >= self.next_prune:
+                self.prune(now)
+            current = self.windows.get((key, index), (0, 0))[0]
+            previous = self.windows.get((key, index - 1), (0, 0))[0]
+            used = int(previous * weight + current)
+            if used >= policy.limit:
+                return False, used
+            self.windows[(key, index)] = (current + 1, now + policy.window * 2)
+            return True, used + 1
+
+    def prune(self, now):
+        self.windows = {k: v for k, v in self.windows.items() if v[1] > now}
+        self.next_prune = now + 60
+
+class RateLimiter:
+    def __init__(self, primary, policies, retry_interval=5.0):
+        self.primary = primary
+        self.breaker = CircuitBreaker('Rate limit store', retry_interval)
+        self.local = primary if isinstance(primary, LocalLimiter) else LocalLimiter()
+        self.policies = {name: Policy(name, **options) for name, options in policies.items()}
+
+    def policy_for(self, url_name):
+        return self.policies.get(url_name) or self.policies['default']
+
+    def hit(self, policy, identity, now=None):
+        now = time.time() if now is None else now
+        key = f'rl:{policy.name}:{identity}'
+        result = None
+        if self.breaker.allow():
+            try:
+                result = self.primary.hit(key, policy, now)
+                self.breaker.success()
+            except Exception:
+                self.breaker.failure()
+        allowed, used = result or self.local.hit(key, policy, now)
+        registry.incr('ratelimit_requests_total', policy=policy.name, outcome='allowed' if allowed else 'blocked')
+        reset = math.ceil(policy.window - now % policy.window)
+        return allowed, max(0, policy.limit - used), reset
+
+def default_limiter():
+    policies = getattr(settings, 'RATELIMIT_POLICIES', {'default': {'limit': 100, 'window': 60}})
+    try:
+        from django_redis import get_redis_connection
+        return RateLimiter(RedisLimiter(get_redis_connection('default')), policies)
+    except (ImportError, NotImplementedError):
+        return RateLimiter(LocalLimiter(), policies)
+
+limiter = default_limiter()
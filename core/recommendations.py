@@ -0,0 +1,173 @@
+import math
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import RentalItem, Reservation, Review, UserAction, ItemSimilarity, UserRecommendation
+
+config = getattr(settings, 'RECOMMENDATIONS', {})
+NEIGHBOURS = config.get('NEIGHBOURS', 20)
+PER_USER = config.get('PER_USER', 20)
+BLOCK_SIZE = config.get('BLOCK_SIZE', 512)
+WEIGHTS = {'reservation': 3.0, 'review': 2.0, 'view': 1.0, **config.get('WEIGHTS', {})}
+
+def similar_items(item_id, limit=4):
+    return [
+        row.neighbor for row in
+        ItemSimilarity.objects.filter(item_id=item_id, neighbor__verified=True).select_related('neighbor').order_by('-score')[:limit]
+    ]
+
+def recommended_items(user, limit=4):
+    return [
+        row.item for row in
+        UserRecommendation.objects.filter(user=user, item__verified=True).select_related('item').order_by('-score')[:limit]
+    ]
+
+def load_interactions():
+    # One weight per (user, listing): bookings count most, reviews scale with the rating,
+    # repeated views are damped.
+    weights = defaultdict(float)
+    reservations = Reservation.objects.exclude(status='canceled')
+    reviews = Review.objects.filter(item__isnull=False)
+    views = UserAction.objects.filter(action='view_listing', user__isnull=False, details__item_id__isnull=False)
+    for user_id, item_id, n in reservations.values_list('renter_id', 'item_id').annotate(n=Count('id')).order_by():
+        weights[user_id, item_id] += WEIGHTS['reservation'] * n
+    for user_id, item_id, rating in reviews.values_list('reviewer_id', 'item_id', 'rating'):
+        weights[user_id, item_id] += WEIGHTS['review'] * rating / 5
+    for user_id, item_id, n in views.values_list('user_id', 'details__item_id').annotate(n=Count('id')).order_by():
+        weights[user_id, int(item_id)] += WEIGHTS['view'] * math.log1p(n)
+    return weights
+
+def active_users(since):
+    return (
+        set(Reservation.objects.filter(created_at__gt=since).values_list('renter_id', flat=True))
+        | set(Review.objects.filter(created_at__gt=since, item__isnull=False).values_list('reviewer_id', flat=True))
+        | set(UserAction.objects.filter(timestamp__gt=since, action='view_listing').exclude(user=None).values_list('user_id', flat=True))
+    )
+
+def last_build():
+    return max(filter(None, (
+        ItemSimilarity.objects.aggregate(at=Max('computed_at'))['at'],
+        UserRecommendation.objects.aggregate(at=Max('computed_at'))['at'],
+    )), default=None)
+
+def build(full=False, block_size=BLOCK_SIZE):
+    # Item-item cosine similarity over the user x listing interaction matrix, kept sparse as
+    # (user, item, weight) arrays sorted by user. Incremental runs only recompute the
+    # listings and users touched by activity since the last build; norms of untouched
+    # listings drift until the next full build.
+    import numpy as np
+
+    started = timezone.now()
+    since = None if full else last_build()
+    weights = load_interactions()
+    existing = dict(RentalItem.objects.values_list('id', 'owner_id'))
+    pairs = [(user_id, item_id, w) for (user_id, item_id), w in weights.items() if item_id in existing]
+    if not pairs:
+        if since is None:
+            ItemSimilarity.objects.all().delete()
+            UserRecommendation.objects.all().delete()
+        return {'items': 0, 'users': 0}
+    user_ids, item_ids, w = (np.array(column) for column in zip(*pairs))
+    w = w.astype(np.float64)
+    users, row = np.unique(user_ids, return_inverse=True)
+    items, col = np.unique(item_ids, return_inverse=True)
+    order = np.lexsort((col, row))
+    row, col, w = row[order], col[order], w[order]
+    starts = np.searchsorted(row, np.arange(len(users)))
+    ends = np.searchsorted(row, np.arange(len(users)), side='right')
+    norms = np.sqrt(np.bincount(col, weights=w * w, minlength=len(items)))
+
+    if since is None:
+        target_users = np.arange(len(users))
+    else:
+        target_users = np.flatnonzero(np.isin(users, list(active_users(since))))
+    target_items = np.unique(col[np.isin(row, target_users)])
+
+    k = min(NEIGHBOURS, len(items) - 1)
+    for offset in range(0, len(target_items) if k > 0 else 0, block_size):
+        block = target_items[offset:offset + block_size]
+        local = np.full(len(items), -1)
+        local[block] = np.arange(len(block))
+        # Every (block entry, other entry of the same user) pair contributes w_ui * w_uj.
+        selected = np.flatnonzero(local[col] >= 0)
+        counts = ends[row[selected]] - starts[row[selected]]
+        left = np.repeat(selected, counts)
+        right = np.repeat(starts[row[selected]] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        # Only (block entry, neighbour) pairs that co-occur are scored, never a dense
+        # block x catalogue matrix.
+        keys, inverse = np.unique(local[col[left]] * len(items) + col[right], return_inverse=True)
+        scores = np.bincount(inverse, weights=w[left] * w[right])
+        source, neighbour = keys // len(items), keys % len(items)
+        scores /= norms[block][source] * norms[neighbour]
+        keep = (neighbour != block[source]) & (scores > 0)
+        source, neighbour, scores = source[keep], neighbour[keep], scores[keep]
+        order = np.lexsort((-scores, source))
+        source, neighbour, scores = source[order], neighbour[order], scores[order]
+        top = np.arange(len(source)) - np.searchsorted(source, source) < k
+        neighbours = {int(items[index]): [] for index in block}
+        for i, j, score in zip(source[top].tolist(), neighbour[top].tolist(), scores[top].tolist()):
+            neighbours[int(items[block[i]])].append((int(items[j]), score))
+        save_similarities(neighbours, started)
+
+    recommended = recommend(np, users, items, row, col, w, target_users, existing, started)
+    if since is None:
+        # Listings and users that no longer have any interactions.
+        ItemSimilarity.objects.filter(computed_at__lt=started).delete()
+        UserRecommendation.objects.filter(computed_at__lt=started).delete()
+    return {'items': len(target_items), 'users': recommended}
+
+@transaction.atomic
+def save_similarities(neighbours, computed_at):
+    ItemSimilarity.objects.filter(item_id__in=list(neighbours)).delete()
+    ItemSimilarity.objects.bulk_create([
+        ItemSimilarity(item_id=item_id, neighbor_id=int(neighbor_id), score=score, computed_at=computed_at)
+        for item_id, ranked in neighbours.items()
+        for neighbor_id, score in ranked
+    ], batch_size=1000)
+
+def recommend(np, users, items, row, col, w, target_users, owners, computed_at):
+    # A user's score for a listing is the sum over listings they interacted with of
+    # weight x similarity, read back from the stored neighbour lists.
+    stored = list(ItemSimilarity.objects.filter(item_id__in=items[np.unique(col[np.isin(row, target_users)])].tolist()).values_list('item_id', 'neighbor_id', 'score'))
+    if not stored:
+        save_recommendations(users[target_users].tolist(), [], computed_at)
+        return len(target_users)
+    source, neighbor, similarity = (np.array(column) for column in zip(*stored))
+    # Rows from an earlier build may name listings that have since lost all interactions.
+    known = np.isin(neighbor, items)
+    source, neighbor, similarity = source[known], neighbor[known], similarity[known]
+    order = np.argsort(source, kind='stable')
+    source, neighbor, similarity = np.searchsorted(items, source[order]), np.searchsorted(items, neighbor[order]), similarity[order]
+    nb_starts = np.searchsorted(source, np.arange(len(items)))
+    nb_ends = np.searchsorted(source, np.arange(len(items)), side='right')
+
+    selected = np.flatnonzero(np.isin(row, target_users))
+    counts = nb_ends[col[selected]] - nb_starts[col[selected]]
+    left = np.repeat(selected, counts)
+    right = np.repeat(nb_starts[col[selected]] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    keys, inverse = np.unique(row[left] * len(items) + neighbor[right], return_inverse=True)
+    scores = np.bincount(inverse, weights=w[left] * similarity[right])
+    user_of, item_of = keys // len(items), keys % len(items)
+    owner_of = np.array([owners[int(item_id)] for item_id in items])
+    keep = ~np.isin(keys, row * len(items) + col) & (owner_of[item_of] != users[user_of])
+    user_of, item_of, scores = user_of[keep], item_of[keep], scores[keep]
+    order = np.lexsort((-scores, user_of))
+    user_of, item_of, scores = user_of[order], item_of[order], scores[order]
+    rank = np.arange(len(user_of)) - np.searchsorted(user_of, user_of)
+    top = rank < PER_USER
+    save_recommendations(
+        users[target_users].tolist(),
+        zip(users[user_of[top]].tolist(), items[item_of[top]].tolist(), scores[top].tolist()),
+        computed_at,
+    )
+    return len(target_users)
+
+@transaction.atomic
+def save_recommendations(user_ids, rows, computed_at):
+    UserRecommendation.objects.filter(user_id__in=user_ids).delete()
+    UserRecommendation.objects.bulk_create([
+        UserRecommendation(user_id=user_id, item_id=item_id, score=score, computed_at=computed_at)
+        for user_id, item_id, score in rows
+    ], batch_size=1000)
@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, F
+from django.utils.module_loading import import_string
+
+RATING_WEIGHT = getattr(settings, 'SEARCH_RATING_WEIGHT', 0.5)
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())[:10]
+
+class SimpleSearchBackend:
+    def setup(self, schema_editor, model):
+        pass
+
+    def index(self, items):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def rebuild(self, queryset, batch_size=1000):
+        pass
+
+    def search(self, queryset, query):
+        for term in terms(query):
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset.order_by('-rating')
+
+class SQLiteFTSBackend(SimpleSearchBackend):
+    table = 'core_rentalitem_fts'
+
+    def setup(self, schema_editor, model):
+        schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')")
+        schema_editor.execute(f'INSERT INTO {self.table} (rowid, title, description) SELECT id, title, description FROM {model._meta.db_table}')
+
+    def index(self, items):
+        rows = [(item.pk, item.title, item.description) for item in items]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def rebuild(self, queryset, batch_size=1000):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        batch = []
+        for item in queryset.only('id', 'title', 'description').iterator(chunk_size=batch_size):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.index(batch)
+                batch = []
+        self.index(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+    def search(self, queryset, query):
+        words = terms(query)
+        if not words:
+            return queryset.order_by('-rating')
+        # bm25() is negative and lower-is-better, so flip it before blending in the rating.
+        return queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = core_rentalitem.id', f'{self.table} MATCH %s'],
+            params=[' '.join(f'"{word}"*' for word in words)],
+            select={'relevance': f'-bm25({self.table}, 2.0, 1.0) + %s * core_rentalitem.rating'},
+            select_params=[RATING_WEIGHT],
+            order_by=['-relevance', '-rating'],
+        )
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    index_name = 'core_rentalitem_search_idx'
+    config = 'english'
+
+    def vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return SearchVector('title', weight='A', config=self.config) + SearchVector('description', weight='B', config=self.config)
+
+    def setup(self, schema_editor, model):
+        from django.contrib.postgres.indexes import GinIndex
+        schema_editor.add_index(model, GinIndex(self.vector(), name=self.index_name))
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search_query = SearchQuery(query, search_type='websearch', config=self.config)
+        return queryset.annotate(document=self.vector()).filter(document=search_query).annotate(
+            relevance=SearchRank(F('document'), search_query) + RATING_WEIGHT * F('rating'),
+        ).order_by('-relevance', '-rating')
+
+@lru_cache(maxsize=None)
+def search_backend():
+    return import_string(getattr(settings, 'SEARCH_BACKEND', 'core.search.SimpleSearchBackend'))()
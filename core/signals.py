@@ -1,29 +1,78 @@
-from django.db.models.signals import post_save
+from datetime import timedelta
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import Rental, Review, Payment, Contract, ActionLog, FeedbackTrend, Notification
-from django.db.models import Avg
+from django.utils import timezone
+from .models import RentalItem, Reservation, Review, SocialPost, BookedPeriod, Badge, ExchangeRate
+from .search import search_backend
+from .cache import listing_cache, invalidate_listing, related_key
+from .gamification import clear_badge_cache
+from .currency import bump_rates_version
+from .analytics import contribution, record_change
+from .media import queue_variants, MEDIA_FIELDS
 
+@receiver(post_save, sender=RentalItem)
+def index_rental_item(sender, instance, **kwargs):
+    search_backend().index([instance])
 
-@receiver(post_save, sender=Rental)
-def log_rental_action(sender, instance, created, **kwargs):
-    action = "created" if created else "updated"
-    ActionLog.objects.create(user=instance.owner, action=f"Rental {action}", target=instance.title)
+@receiver(post_delete, sender=RentalItem)
+def unindex_rental_item(sender, instance, **kwargs):
+    search_backend().remove([instance.pk])
 
+@receiver([post_save, post_delete], sender=RentalItem)
+def invalidate_rental_item(sender, instance, **kwargs):
+    def invalidate():
+        invalidate_listing(instance.pk)
+        listing_cache.delete_many([related_key(instance.type)])
+    transaction.on_commit(invalidate)
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_reviewed_listing(sender, instance, **kwargs):
+    if instance.item_id:
+        transaction.on_commit(lambda: invalidate_listing(instance.item_id, None, 'reviews', f'reviewed:{instance.reviewer_id}'))
+
+@receiver([post_save, post_delete], sender=BookedPeriod)
+def invalidate_booked_days(sender, instance, **kwargs):
+    month = timezone.localtime(instance.start).date().replace(day=1)
+    last_day = timezone.localtime(instance.end).date()
+    parts = []
+    while month <= last_day:
+        parts.append(f'booked:{month:%Y-%m}')
+        month = (month + timedelta(days=32)).replace(day=1)
+    transaction.on_commit(lambda: invalidate_listing(instance.item_id, *parts))
+
+@receiver([post_save, post_delete], sender=Badge)
+def invalidate_badges(sender, instance, **kwargs):
+    transaction.on_commit(clear_badge_cache)
+
+@receiver([post_save, post_delete], sender=ExchangeRate)
+def invalidate_rates(sender, instance, **kwargs):
+    transaction.on_commit(bump_rates_version)
+
+@receiver(pre_save, sender=Reservation)
+@receiver(pre_save, sender=Review)
+def remember_listing_stats(sender, instance, **kwargs):
+    previous = None if instance._state.adding else sender.objects.filter(pk=instance.pk).first()
+    instance._stats_before = contribution(previous) if previous else {}
+
+@receiver(post_save, sender=Reservation)
 @receiver(post_save, sender=Review)
-def update_feedback_trend(sender, instance, created, **kwargs):
-    if created and instance.rental:
-        date = instance.created_at.date()
-        reviews = Review.objects.filter(rental=instance.rental, created_at__date=date)
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-        FeedbackTrend.objects.update_or_create(rental=instance.rental, date=date, defaults={'avg_rating': avg_rating})
-
-@receiver(post_save, sender=Payment)
-def notify_payment(sender, instance, created, **kwargs):
-    if created:
-        target = instance.rental.owner if instance.rental else instance.package.owner
-        Notification.objects.create(user=target, content=f"{instance.payer} made a payment: {instance.transaction_id}", link=f"/rental/{instance.rental.id}/" if instance.rental else f"/dashboard/")
-
-@receiver(post_save, sender=Contract)
-def notify_contract(sender, instance, created, **kwargs):
-    if created:
-        Notification.objects.create(user=instance.rental.owner, content=f"{instance.tenant} created a contract for {instance.rental}", link=f"/rental/{instance.rental.id}/")
\ No newline at end of file
+def update_listing_stats(sender, instance, **kwargs):
+    before, after = getattr(instance, '_stats_before', {}), contribution(instance)
+    if instance.item_id:
+        # robust: the booking or review is already committed; compact_listing_stats repairs
+        # a rollup that failed to apply.
+        transaction.on_commit(lambda: record_change(instance, before, after), robust=True)
+
+@receiver(post_delete, sender=Reservation)
+@receiver(post_delete, sender=Review)
+def remove_listing_stats(sender, instance, **kwargs):
+    before = contribution(instance)
+    if instance.item_id:
+        transaction.on_commit(lambda: record_change(instance, before, {}), robust=True)
+
+@receiver(post_save, sender=RentalItem)
+@receiver(post_save, sender=SocialPost)
+@receiver(post_save, sender=Reservation)
+def generate_media_variants(sender, instance, **kwargs):
+    queue_variants(instance, MEDIA_FIELDS[sender])
@@ -0,0 +1,26 @@
+import hashlib
+import os
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    # Files are named by the SHA-256 of their content under the first directory of
+    # upload_to, e.g. items/3f/a2/3fa2...c9.jpg, so the same bytes are stored once. A stored
+    # file may be shared by several rows and must not be deleted on behalf of one of them.
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, 'sha256', None) or self.digest(content)
+        prefix = name.replace('\\', '/').split('/', 1)[0] if '/' in name else ''
+        extension = os.path.splitext(name)[1].lower()
+        name = '/'.join(part for part in (prefix, digest[:2], digest[2:4], digest + extension) if part)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def digest(self, content):
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+content_storage = ContentAddressedStorage()
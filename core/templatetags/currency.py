@@ -0,0 +1,9 @@
+from django import template
+from ..currency import with_prices
+
+register = template.Library()
+
+@register.filter
+def in_currency(items, target):
+    # One rate lookup per source currency for the whole list, not one per item.
+    return with_prices(items, target)
@@ -0,0 +1,24 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+@register.simple_tag
+def picture(file, variants, width, alt='', css=''):
+    # Serves the smallest variant at least `width` px wide (the browser may pick another
+    # from srcset for high-density screens), or the original until variants exist.
+    if not file:
+        return ''
+    if variants.get('source') != file.name:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', file.url, alt, css)
+    sizes = sorted({entry['width']: entry for name, entry in variants.items() if name != 'source'}.values(), key=lambda entry: entry['width'])
+    chosen = next((entry for entry in sizes if entry['width'] >= width), sizes[-1])
+
+    def srcset(key):
+        return format_html_join(', ', '{} {}w', ((file.storage.url(entry[key]), entry['width']) for entry in sizes))
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}px">'
+        '<img src="{}" srcset="{}" sizes="{}px" width="{}" height="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        srcset('webp'), width, file.storage.url(chosen['jpeg']), srcset('jpeg'), width, chosen['width'], chosen['height'], alt, css,
+    )
@@ -1,3 +1,727 @@
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from unittest import mock
+from io import BytesIO, StringIO
+from datetime import date, datetime, timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from decimal import Decimal
+from PIL import Image
+from notifications.models import Notification
+from .models import UserAction, RentalItem, Reservation, BookedPeriod, SocialPost, Comment, UserProfile, Badge, UserBadge, Message, ExchangeRate, Review, ListingDailyStats
+from .availability import overlapping, booked_days, book, day_bounds
+from .booking import reserve, is_lock_failure, BookingConflict
+from .likes import like, unlike, liked_post_ids
+from .feed import feed_queryset, keyset_page, COMMENT_PAGE_SIZE
+from .search import search_backend
+from .events import ActionBuffer
+from .gamification import award_points, clear_badge_cache
+from .chat import history, mark_read, inbox
+from .currency import convert, convert_many, bump_rates_version
+from .pricing import quote
+from .analytics import record_views, owner_summary, compact
+from .media import process
+from .recommendations import build, similar_items, recommended_items
+from .geo import encode, covering_cells, nearby
+from .templatetags.media import picture
+from .middleware import ProfilingMiddleware, QueryBudgetExceeded
+from .ratelimit import RateLimiter, LocalLimiter
+from .cache import LocalLRU, listing_cache
+from .counters import ViewCounter, LocalViewCounter
 
-# Create your tests here.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@contextmanager
+def buffered_actions():
+    # Views record UserActions through the module-level buffer, whose worker would write them
+    # after the test is gone. Give the test its own buffer and write it inside the test.
+    actions = ActionBuffer()
+    with mock.patch('core.events.buffer', actions), mock.patch.object(actions, 'ensure_worker'):
+        yield actions
+        actions.flush()
+
+class ConcurrentBookingTest(TransactionTestCase):
+    renters = 8
+
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.item = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='2-person tent', base_price=10, verified=True)
+        self.users = [User.objects.create(username=f'renter{i}') for i in range(self.renters)]
+
+    def test_exactly_one_of_parallel_bookings_wins(self):
+        start = timezone.now() + timedelta(days=3)
+        end = start + timedelta(days=2)
+        barrier = threading.Barrier(self.renters)
+        outcomes = []
+
+        def attempt(user):
+            try:
+                barrier.wait()
+                reserve(self.item, Reservation(renter=user, total_cost=20), start, end)
+                outcomes.append('won')
+            except BookingConflict:
+                outcomes.append('conflict')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('won'), 1)
+        self.assertEqual(outcomes.count('conflict'), self.renters - 1)
+        self.assertEqual(Reservation.objects.filter(item=self.item).count(), 1)
+        self.assertEqual(BookedPeriod.objects.filter(item=self.item).count(), 1)
+
+class ReserveTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.renter = User.objects.create(username='renter')
+        self.item = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='2-person tent', base_price=10, verified=True)
+        self.start = timezone.now() + timedelta(days=3)
+
+    def test_adjacent_periods_do_not_conflict(self):
+        reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start, self.start + timedelta(days=1))
+        reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start + timedelta(days=1), self.start + timedelta(days=2))
+        self.assertEqual(BookedPeriod.objects.filter(item=self.item).count(), 2)
+
+    def test_canceling_frees_the_period(self):
+        reservation = reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start, self.start + timedelta(days=1))
+        with self.assertRaises(BookingConflict):
+            reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start, self.start + timedelta(hours=2))
+        reservation.status = 'canceled'
+        reservation.save()
+        reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start, self.start + timedelta(hours=2))
+
+    def test_only_lock_failures_are_retried(self):
+        end = self.start + timedelta(days=1)
+        failures = [OperationalError('database is locked')]
+
+        def flaky_book(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return book(*args, **kwargs)
+
+        with mock.patch('core.booking.time.sleep'), mock.patch('core.booking.book', flaky_book):
+            reserve(self.item, Reservation(renter=self.renter, total_cost=10), self.start, end)
+        self.assertEqual(Reservation.objects.filter(item=self.item).count(), 1)
+        with mock.patch('core.booking.book', side_effect=OperationalError('no such table: core_bookedperiod')):
+            with self.assertRaisesMessage(OperationalError, 'no such table'):
+                reserve(self.item, Reservation(renter=self.renter, total_cost=10), end, end + timedelta(days=1))
+
+    def test_classifies_sqlite_errors_by_code(self):
+        def wrapped(message, code):
+            cause = sqlite3.OperationalError(message)
+            cause.sqlite_errorcode = code
+            error = OperationalError(message)
+            error.__cause__ = cause
+            return error
+        self.assertTrue(is_lock_failure(wrapped('database is locked', sqlite3.SQLITE_BUSY)))
+        self.assertTrue(is_lock_failure(wrapped('database table is locked', sqlite3.SQLITE_LOCKED)))
+        self.assertFalse(is_lock_failure(wrapped('no such table: core_bookedperiod', sqlite3.SQLITE_ERROR)))
+        self.assertTrue(is_lock_failure(OperationalError('database table is locked')))
+
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        self.enterContext(buffered_actions())
+        owner = User.objects.create(username='owner')
+        self.tent = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='x', base_price=10, verified=True)
+        self.bike = RentalItem.objects.create(owner=owner, type='item', title='Bike', description='x', base_price=10, verified=True)
+        self.first_day = timezone.localdate() + timedelta(days=3)
+        self.start, self.end = day_bounds(self.first_day, self.first_day + timedelta(days=1))
+        book(self.tent, self.start, self.end)
+
+    def test_periods_are_half_open(self):
+        self.assertTrue(overlapping(self.tent.pk, self.end - timedelta(hours=1), self.end + timedelta(hours=1)).exists())
+        self.assertFalse(overlapping(self.tent.pk, self.end, self.end + timedelta(days=1)).exists())
+        self.assertFalse(overlapping(self.tent.pk, self.start - timedelta(days=1), self.start).exists())
+        self.assertFalse(overlapping(self.bike.pk, self.start, self.end).exists())
+        days = booked_days(self.tent, self.first_day - timedelta(days=1), self.first_day + timedelta(days=5))
+        self.assertEqual(sorted(days), [self.first_day.isoformat(), (self.first_day + timedelta(days=1)).isoformat()])
+
+    def test_search_hides_listings_booked_in_the_range(self):
+        def search(available_from, available_to=''):
+            response = self.client.get('/search/', {'available_from': available_from, 'available_to': available_to})
+            return sorted(item.title for item in response.context['results'])
+        self.assertEqual(search(self.first_day + timedelta(days=1)), ['Bike'])
+        self.assertEqual(search(self.first_day - timedelta(days=2), self.first_day), ['Bike'])
+        self.assertEqual(search(self.first_day + timedelta(days=2), self.first_day + timedelta(days=4)), ['Bike', 'Tent'])
+
+class SearchTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.pegs = RentalItem.objects.create(owner=owner, type='item', title='Pegs', description='Spare pegs for any tent', base_price=5, rating=4.0, verified=True)
+        self.tent = RentalItem.objects.create(owner=owner, type='item', title='Family tent', description='Sleeps six', base_price=30, rating=4.0, verified=True)
+        self.stove = RentalItem.objects.create(owner=owner, type='item', title='Camping stove', description='Two burners', base_price=8, verified=True)
+
+    def search(self, query):
+        return [item.title for item in search_backend().search(RentalItem.objects.all(), query)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('tent'), ['Family tent', 'Pegs'])
+        self.assertEqual(self.search('camp'), ['Camping stove'])
+
+    def test_saving_and_deleting_reindex(self):
+        self.stove.title = 'Gas cooker'
+        self.stove.save()
+        self.assertEqual(self.search('camping'), [])
+        self.assertEqual(self.search('cooker'), ['Gas cooker'])
+        self.tent.delete()
+        self.assertEqual(self.search('tent'), ['Pegs'])
+
+class ActionBufferTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='visitor')
+        self.buffer = ActionBuffer(batch_size=10, max_pending=3, sample_rates={'noisy': 0.0})
+        self.enterContext(mock.patch.object(self.buffer, 'ensure_worker'))
+
+    def test_caller_flushes_once_max_pending_is_reached(self):
+        self.buffer.record(self.user, 'search')
+        self.buffer.record(None, 'search')
+        self.buffer.record(self.user, 'noisy')
+        self.assertFalse(UserAction.objects.exists())
+        self.buffer.record(self.user, 'search', {'query': 'tent'})
+        self.assertEqual(UserAction.objects.count(), 3)
+        self.assertEqual((self.buffer.pending, self.buffer.sampled_out), ([], 1))
+
+    def test_exit_flush_writes_what_is_left(self):
+        # atexit runs the module buffer's flush().
+        self.buffer.record(self.user, 'search')
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(UserAction.objects.get().user, self.user)
+
+class ActionBufferIntegrityTest(TransactionTestCase):
+    def test_only_rows_that_fail_integrity_checks_are_dropped(self):
+        buffer = ActionBuffer(batch_size=10)
+        self.enterContext(mock.patch.object(buffer, 'ensure_worker'))
+        kept, gone = User.objects.create(username='kept'), User.objects.create(username='gone')
+        for user in (kept, gone, None):
+            buffer.record(user, 'search')
+        gone.delete()
+        with self.assertLogs('core.events', 'WARNING'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.failed, 1)
+        self.assertEqual(sorted(UserAction.objects.values_list('user_id', flat=True), key=str), [kept.pk, None])
+
+class RatingTotalsTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.profile = UserProfile.objects.create(user=owner, phone_number='0700000001')
+        self.item = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='x', base_price=10, verified=True)
+        self.reviewers = [User.objects.create(username=f'reviewer{i}') for i in range(2)]
+
+    def totals(self, obj):
+        obj.refresh_from_db()
+        return obj.rating_sum, obj.review_count, obj.rating
+
+    def test_totals_follow_create_edit_and_delete(self):
+        first = Review.objects.create(reviewer=self.reviewers[0], item=self.item, rating=5)
+        Review.objects.create(reviewer=self.reviewers[1], item=self.item, rating=2)
+        Review.objects.create(reviewer=self.reviewers[0], profile=self.profile, rating=4)
+        self.assertEqual(self.totals(self.item), (7, 2, 3.5))
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.totals(self.item), (5, 2, 2.5))
+        first.delete()
+        self.assertEqual(self.totals(self.item), (2, 1, 2.0))
+        self.assertEqual(self.totals(self.profile), (4, 1, 4.0))
+
+    def test_reconcile_ratings_repairs_drift(self):
+        Review.objects.create(reviewer=self.reviewers[0], item=self.item, rating=4)
+        RentalItem.objects.update(rating_sum=9, review_count=3, rating=3.0)
+        UserProfile.objects.update(rating_sum=1, review_count=1, rating=1.0)
+        out = StringIO()
+        call_command('reconcile_ratings', batch_size=1, stdout=out)
+        self.assertIn('RentalItem: corrected 1 rows', out.getvalue())
+        self.assertIn('UserProfile: corrected 1 rows', out.getvalue())
+        self.assertEqual(self.totals(self.item), (4, 1, 4.0))
+        self.assertEqual(self.totals(self.profile), (0, 0, 0.0))
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ListingCacheTest(TestCase):
+    def setUp(self):
+        self.enterContext(buffered_actions())
+        cache.clear()
+        self.enterContext(mock.patch.object(listing_cache, 'local', LocalLRU()))
+        owner = User.objects.create(username='owner')
+        self.item = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='x', base_price=10, verified=True)
+        self.renter = User.objects.create(username='renter')
+        UserProfile.objects.create(user=self.renter, phone_number='0700000002')
+        self.client.force_login(self.renter)
+
+    def test_saving_a_review_invalidates_the_cached_listing(self):
+        response = self.client.get(f'/listing/{self.item.pk}/')
+        self.assertEqual((response.context['reviews'], response.context['can_review']), ([], True))
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(reviewer=self.renter, item=self.item, rating=4)
+        response = self.client.get(f'/listing/{self.item.pk}/')
+        self.assertEqual(len(response.context['reviews']), 1)
+        self.assertFalse(response.context['can_review'])
+        self.assertEqual(response.context['item'].rating, 4.0)
+
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.items = [RentalItem.objects.create(owner=owner, type='item', title=f'Item {i}', description='x', base_price=10, views=i) for i in range(3)]
+        self.counter = ViewCounter(LocalViewCounter(), batch_size=1)
+        self.enterContext(mock.patch.object(self.counter, 'ensure_worker'))
+
+    def test_flush_adds_pending_counts_in_batches(self):
+        for item, n in zip(self.items, (3, 0, 2)):
+            for _ in range(n):
+                self.counter.incr(item.pk)
+        self.assertEqual(self.counter.pending([item.pk for item in self.items])[self.items[0].pk], 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.counter.flush(), 5)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_rentalitem"')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all('CASE WHEN' in sql for sql in updates))
+        self.assertEqual([item.views for item in RentalItem.objects.order_by('pk')], [3, 1, 4])
+        self.assertEqual(sum(self.counter.pending([item.pk for item in self.items]).values()), 0)
+        self.assertEqual(ListingDailyStats.objects.get(item=self.items[2]).views, 2)
+
+    def test_counts_in_process_when_the_store_fails(self):
+        primary = mock.Mock(incr=mock.Mock(side_effect=ConnectionError))
+        counter = ViewCounter(primary)
+        self.enterContext(mock.patch.object(counter, 'ensure_worker'))
+        with self.assertLogs('core.breaker', 'WARNING') as logs:
+            for _ in range(3):
+                counter.incr(self.items[0].pk)
+        self.assertEqual(counter.local.pending([self.items[0].pk])[self.items[0].pk], 3)
+        # The store is left alone until the retry interval has passed.
+        self.assertEqual((primary.incr.call_count, len(logs.records)), (1, 1))
+        self.assertIsNotNone(logs.records[0].exc_info)
+        counter.breaker.retry_at = 0
+        primary.incr.side_effect = None
+        counter.incr(self.items[0].pk)
+        self.assertEqual(primary.incr.call_count, 2)
+        self.assertFalse(counter.breaker.failing)
+
+class RateLimitTest(TestCase):
+    policies = {'default': {'limit': 100, 'window': 60}, 'search': {'limit': 3, 'window': 60}}
+
+    def setUp(self):
+        self.enterContext(buffered_actions())
+        self.limiter = RateLimiter(LocalLimiter(), self.policies)
+        self.search = self.limiter.policy_for('search')
+
+    def test_limit_holds_across_the_sliding_window(self):
+        outcomes = [self.limiter.hit(self.search, 'user:1', now=120.0 + i) for i in range(4)]
+        self.assertEqual(outcomes, [(True, 2, 60), (True, 1, 59), (True, 0, 58), (False, 0, 57)])
+        self.assertTrue(self.limiter.hit(self.search, 'user:2', now=125.0)[0])
+        # The previous window still counts in full at its end, then fades out.
+        self.assertFalse(self.limiter.hit(self.search, 'user:1', now=180.0)[0])
+        self.assertEqual(self.limiter.hit(self.search, 'user:1', now=210.0), (True, 1, 30))
+
+    def test_limits_in_process_when_the_store_fails(self):
+        primary = mock.Mock(hit=mock.Mock(side_effect=ConnectionError))
+        limiter = RateLimiter(primary, self.policies)
+        with self.assertLogs('core.breaker', 'WARNING') as logs:
+            outcomes = [limiter.hit(self.search, 'user:1', now=120.0)[0] for _ in range(4)]
+        self.assertEqual(outcomes, [True, True, True, False])
+        self.assertEqual((primary.hit.call_count, len(logs.records)), (1, 1))
+        limiter.breaker.retry_at = 0
+        primary.hit.side_effect = None
+        primary.hit.return_value = (True, 1)
+        self.assertEqual(limiter.hit(self.search, 'user:3', now=120.0), (True, 2, 60))
+        self.assertEqual(primary.hit.call_count, 2)
+
+    def test_middleware_sets_headers_and_returns_429(self):
+        self.enterContext(mock.patch('core.middleware.limiter', self.limiter))
+        responses = [self.client.get('/search/') for _ in range(4)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200, 429])
+        self.assertEqual([r['X-RateLimit-Remaining'] for r in responses], ['2', '1', '0', '0'])
+        self.assertEqual(responses[0]['X-RateLimit-Limit'], '3')
+        self.assertTrue(0 < int(responses[3]['Retry-After']) <= 60)
+        self.assertEqual(responses[3]['Retry-After'], responses[3]['X-RateLimit-Reset'])
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+class ProfilingMiddlewareTest(TestCase):
+    def view(self, queries):
+        def get_response(request):
+            request.resolver_match = resolve('/search/')
+            for _ in range(queries):
+                User.objects.exists()
+            return HttpResponse()
+        return ProfilingMiddleware(get_response)
+
+    @override_settings(PROFILING={'SAMPLE_RATE': 1.0, 'BUDGET_ACTION': 'raise', 'BUDGETS': {'search': 2}})
+    def test_raises_when_view_exceeds_budget(self):
+        self.view(2)(RequestFactory().get('/search/'))
+        with self.assertRaises(QueryBudgetExceeded):
+            self.view(3)(RequestFactory().get('/search/'))
+
+class LikeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='fan')
+        self.posts = [SocialPost.objects.create(user=self.user, caption=f'post {i}') for i in range(3)]
+
+    def test_like_and_unlike_are_idempotent(self):
+        post = self.posts[0]
+        self.assertTrue(like(self.user, post.pk))
+        self.assertFalse(like(self.user, post.pk))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertTrue(unlike(self.user, post.pk))
+        self.assertFalse(unlike(self.user, post.pk))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+    def test_liked_post_ids_is_one_query(self):
+        like(self.user, self.posts[1].pk)
+        with self.assertNumQueries(1):
+            liked = liked_post_ids(self.user, [post.pk for post in self.posts])
+        self.assertEqual(liked, {self.posts[1].pk})
+
+class FeedTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='poster')
+        now = timezone.now()
+        # Equal timestamps: the id tie-breaker alone keeps pages apart.
+        self.posts = [SocialPost.objects.create(user=self.user, caption=f'post {i}', created_at=now) for i in range(5)]
+        for i in range(4):
+            Comment.objects.create(post=self.posts[0], user=self.user, text=f'comment {i}')
+
+    def test_cursor_pages_survive_ties_and_new_posts(self):
+        first, cursor = keyset_page(feed_queryset(), None, 2)
+        SocialPost.objects.create(user=self.user, caption='newer')
+        second, cursor = keyset_page(feed_queryset(), cursor, 2)
+        third, cursor = keyset_page(feed_queryset(), cursor, 2)
+        self.assertEqual(first + second + third, self.posts[::-1])
+        self.assertIsNone(cursor)
+        self.assertEqual(keyset_page(feed_queryset(), 'garbage', 2)[0][0].caption, 'newer')
+
+    def test_feed_page_is_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(2):
+            posts, _ = keyset_page(feed_queryset(), None, 10)
+            comments = {post.pk: [c.text for c in post.latest_comments] for post in posts}
+            [(post.user.username, post.item) for post in posts]
+        self.assertEqual(comments[self.posts[0].pk], ['comment 3', 'comment 2', 'comment 1'])
+        # Top-rated listings are cached after the first request.
+        self.client.get('/')
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/').status_code, 200)
+
+class CommentTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='poster')
+        self.post = SocialPost.objects.create(user=self.owner, caption='Sunset')
+        self.fan = User.objects.create(username='fan')
+        UserProfile.objects.create(user=self.fan, phone_number='0700000003')
+        clear_badge_cache()
+        self.client.force_login(self.fan)
+
+    def test_add_comment(self):
+        response = self.client.post(f'/comment/{self.post.pk}/', {'comment': '  Lovely  '})
+        self.assertEqual(response.json()['comment']['text'], 'Lovely')
+        self.assertEqual(self.client.post(f'/comment/{self.post.pk}/', {'comment': ' '}).status_code, 400)
+        self.assertEqual(self.client.get(f'/comment/{self.post.pk}/').status_code, 400)
+        self.assertEqual(self.client.post('/comment/999999/', {'comment': 'hi'}).status_code, 404)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(UserProfile.objects.get(user=self.fan).points, 10)
+        self.assertEqual(Notification.objects.get(user=self.owner).kind, 'comment')
+
+    def test_comments_page_newest_first(self):
+        for i in range(COMMENT_PAGE_SIZE + 5):
+            Comment.objects.create(post=self.post, user=self.fan, text=f'comment {i}')
+        first = self.client.get(f'/comments/{self.post.pk}/').json()
+        self.assertEqual(len(first['comments']), COMMENT_PAGE_SIZE)
+        self.assertEqual(first['comments'][0]['text'], f'comment {COMMENT_PAGE_SIZE + 4}')
+        second = self.client.get(f'/comments/{self.post.pk}/', {'cursor': first['next']}).json()
+        self.assertEqual([c['text'] for c in second['comments']], [f'comment {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(second['next'])
+
+class AwardPointsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='player')
+        UserProfile.objects.create(user=self.user, phone_number='0700000000')
+        for name, points in (('Starter', 10), ('Regular', 20), ('Veteran', 100)):
+            Badge.objects.create(name=name, description=name, points_required=points)
+        clear_badge_cache()
+
+    def test_awards_every_crossed_badge_once(self):
+        earned = award_points(self.user, 25, 'booking')
+        self.assertEqual([badge.name for badge in earned], ['Starter', 'Regular'])
+        self.assertEqual(award_points(self.user, 5, 'like'), [])
+        self.assertEqual(UserProfile.objects.get(user=self.user).points, 30)
+        self.assertEqual(UserBadge.objects.filter(user=self.user).count(), 2)
+
+class ChatHistoryTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        for i in range(5):
+            sender, receiver = (self.bob, self.alice) if i % 2 == 0 else (self.alice, self.bob)
+            Message.objects.create(sender=sender, receiver=receiver, content=f'message {i}')
+
+    def test_pages_back_through_the_conversation(self):
+        latest, cursor = history(self.alice, self.bob, page_size=3)
+        self.assertEqual([m.content for m in latest], ['message 2', 'message 3', 'message 4'])
+        older, cursor = history(self.bob, self.alice, cursor, page_size=3)
+        self.assertEqual([m.content for m in older], ['message 0', 'message 1'])
+        self.assertIsNone(cursor)
+
+    def test_only_visible_messages_are_marked_read(self):
+        latest, _ = history(self.alice, self.bob, page_size=3)
+        self.assertEqual(mark_read(self.alice, latest), 2)
+        self.assertEqual(inbox(self.alice)[0]['unread'], 1)
+
+class CurrencyTest(TestCase):
+    def setUp(self):
+        for currency, rate in (('USD', '1'), ('KES', '130'), ('EUR', '0.9')):
+            ExchangeRate.objects.create(currency=currency, rate=Decimal(rate))
+        bump_rates_version()
+
+    def test_cross_rates_go_through_the_pivot(self):
+        self.assertEqual(convert(Decimal('1300.00'), 'KES', 'EUR'), Decimal('9.00'))
+        self.assertEqual(convert(Decimal('9.00'), 'EUR', 'KES'), Decimal('1300.00'))
+
+    def test_currencies_without_a_stored_rate_use_the_settings_table(self):
+        self.assertEqual(convert(Decimal('0.75'), 'GBP', 'USD'), Decimal('1.00'))
+        self.assertEqual(convert(Decimal('0.75'), 'GBP', 'EUR'), Decimal('0.90'))
+
+    def test_batch_conversion_matches_single_conversion(self):
+        owner = User.objects.create(username='lister')
+        items = [
+            RentalItem(owner=owner, title='Tent', base_price=Decimal('650.00'), base_currency='KES'),
+            RentalItem(owner=owner, title='Bike', base_price=Decimal('12.50'), base_currency='USD'),
+        ]
+        self.assertEqual(convert_many(items, 'EUR'), [convert(i.base_price, i.base_currency, 'EUR') for i in items])
+
+class PricingTest(TestCase):
+    rules = {
+        'weekend': 1.5,
+        'seasons': [{'start': '12-20', 'end': '01-05', 'multiplier': 2}],
+        'peak': {'multiplier': 1.1, 'dates': ['2025-12-25']},
+        'length_discounts': {'7': 0.9},
+    }
+
+    def test_prices_each_day_of_the_stay(self):
+        item = RentalItem(type='item', base_price=Decimal('100.00'), pricing_rules=self.rules)
+        # Mon-Fri in season (Christmas also peak), then a weekend in season, 10% off for a week.
+        result = quote(item, date(2025, 12, 22), date(2025, 12, 29))
+        self.assertEqual((result['units'], result['subtotal'], result['total']), (7, Decimal('1620.00'), Decimal('1458.00')))
+
+    def test_services_are_priced_per_hour(self):
+        item = RentalItem(type='service', base_price=Decimal('10.00'), pricing_rules={'weekend': 2})
+        result = quote(item, datetime(2025, 1, 3, 22), datetime(2025, 1, 4, 2, 30))
+        self.assertEqual((result['units'], result['total']), (5, Decimal('80.00')))
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PriceQuoteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(listing_cache, 'local', LocalLRU()))
+        for currency, rate in (('USD', '1'), ('KES', '100')):
+            ExchangeRate.objects.create(currency=currency, rate=Decimal(rate))
+        bump_rates_version()
+        owner = User.objects.create(username='owner')
+        self.item = RentalItem.objects.create(owner=owner, type='item', title='Tent', description='x', base_price=Decimal('1000.00'), base_currency='KES', verified=True)
+
+    def get(self, *ranges, **params):
+        return self.client.get(f'/quote/{self.item.pk}/', {'range': list(ranges), **params})
+
+    def test_prices_every_range_in_the_requested_currency(self):
+        response = self.get('2025-03-03/2025-03-05', '2025-03-05T10:00/2025-03-06T09:00', currency='USD')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['currency'], 'USD')
+        self.assertEqual([(q['units'], q['unit'], q['total']) for q in response.json()['quotes']], [(2, 'day', '20.00'), (1, 'day', '10.00')])
+
+    def test_rejects_bad_ranges_and_unknown_currencies(self):
+        for value in ('2025-03-05/2025-03-03', 'tomorrow', '2025-03-03'):
+            response = self.get(value)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], f'Invalid range: {value}')
+        response = self.get('2025-03-03/2025-03-05', currency='XYZ')
+        self.assertEqual((response.status_code, response.json()['error']), (400, 'Unknown currency: XYZ'))
+
+    def test_unverified_listings_are_not_priced(self):
+        RentalItem.objects.filter(pk=self.item.pk).update(verified=False)
+        self.assertEqual(self.get('2025-03-03/2025-03-05').status_code, 404)
+
+class ListingStatsTest(TestCase):
+    def setUp(self):
+        ExchangeRate.objects.create(currency='USD', rate=Decimal('1'))
+        ExchangeRate.objects.create(currency='KES', rate=Decimal('100'))
+        bump_rates_version()
+        self.owner = User.objects.create(username='owner')
+        self.renter = User.objects.create(username='renter')
+        self.item = RentalItem.objects.create(owner=self.owner, type='item', title='Tent', description='Tent', base_price=Decimal('1000.00'), base_currency='KES')
+
+    def book(self, cost):
+        now = timezone.now()
+        return Reservation.objects.create(renter=self.renter, item=self.item, start_date=now, end_date=now + timedelta(days=1), total_cost=Decimal(cost))
+
+    def test_rollups_follow_bookings_reviews_and_views(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book('1000.00')
+            canceled = self.book('500.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            canceled.status = 'canceled'
+            canceled.save()
+            review = Review.objects.create(reviewer=self.renter, item=self.item, rating=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            review.rating = 4
+            review.save()
+        record_views({self.item.pk: 7})
+        totals, series = owner_summary(self.owner, 'USD', days=7)
+        self.assertEqual((totals['views'], totals['bookings'], totals['revenue'], totals['rating']), (7, 1, Decimal('10.00'), 4.0))
+        self.assertEqual(series[-1]['bookings'], 1)
+
+    def test_compaction_rebuilds_event_columns(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book('1000.00')
+        ListingDailyStats.objects.update(bookings=5, revenue=0)
+        self.assertEqual(compact(timezone.localdate()), (1, 0))
+        row = ListingDailyStats.objects.get()
+        self.assertEqual((row.bookings, row.revenue), (1, Decimal('1000.00')))
+        Reservation.objects.update(status='canceled')
+        self.assertEqual(compact(timezone.localdate()), (1, 1))
+
+class MediaVariantsTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root.name))
+        self.item = RentalItem.objects.create(owner=User.objects.create(username='owner'), type='item', title='Tent', description='Tent', base_price=Decimal('10.00'))
+        image = Image.new('RGB', (1000, 500), 'red')
+        exif = image.getexif()
+        exif[0x0110] = 'Secret Camera'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        self.item.image.save('tent.jpg', ContentFile(buffer.getvalue()))
+
+    def test_variants_are_resized_without_exif(self):
+        self.assertTrue(process(RentalItem, self.item.pk, 'image', {'thumb': 100, 'card': 400, 'full': 1600}, 80))
+        self.item.refresh_from_db()
+        variants = self.item.image_variants
+        self.assertEqual((variants['thumb']['width'], variants['card']['height']), (100, 200))
+        # Never upscaled past the original.
+        self.assertEqual(variants['full']['width'], 1000)
+        with self.item.image.storage.open(variants['card']['jpeg']) as f:
+            self.assertEqual(dict(Image.open(f).getexif()), {})
+        self.assertFalse(process(RentalItem, self.item.pk, 'image', {'thumb': 100}, 80))
+        self.assertIn(variants['card']['jpeg'], picture(self.item.image, variants, 300))
+
+class UploadTest(TestCase):
+    def setUp(self):
+        self.enterContext(buffered_actions())
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root.name))
+        self.user = User.objects.create(username='poster')
+        UserProfile.objects.create(user=self.user, phone_number='0700000001')
+        self.client.force_login(self.user)
+        clear_badge_cache()
+
+    def post(self, name, content):
+        return self.client.post('/add-post/', {'caption': 'Look', 'media': SimpleUploadedFile(name, content)})
+
+    def test_identical_uploads_are_stored_once(self):
+        buffer = BytesIO()
+        Image.new('RGB', (20, 20), 'blue').save(buffer, 'PNG')
+        self.post('one.png', buffer.getvalue())
+        self.post('two.png', buffer.getvalue())
+        first, second = SocialPost.objects.order_by('id')
+        self.assertEqual(first.media.name, second.media.name)
+        self.assertTrue(first.media.name.startswith('posts/'))
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.media_root.name)), 1)
+
+    def test_rejects_disguised_and_oversized_files(self):
+        response = self.post('fake.png', b'<?php echo 1; ?>')
+        self.assertEqual(response.context['form'].errors['media'], ['Unsupported file type.'])
+        with mock.patch.dict('core.uploads.LIMITS', {'media': {'video/mp4': 1000}}):
+            response = self.post('clip.mp4', b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 200000)
+        self.assertIn('File too large', response.context['form'].errors['media'][0])
+        self.assertFalse(SocialPost.objects.exists())
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.items = [
+            RentalItem.objects.create(owner=owner, type='item', title=f'Item {n}', description='x', base_price=Decimal('10.00'), verified=True)
+            for n in range(4)
+        ]
+        self.users = [User.objects.create(username=f'renter{n}') for n in range(3)]
+        for user, items in zip(self.users, ([0, 1], [0, 1, 2], [0])):
+            for n in items:
+                self.book(user, self.items[n])
+
+    def book(self, user, item):
+        now = timezone.now()
+        Reservation.objects.create(renter=user, item=item, start_date=now, end_date=now + timedelta(days=1), total_cost=Decimal('10.00'))
+
+    def test_recommends_co_booked_listings(self):
+        self.assertEqual(build(full=True), {'items': 3, 'users': 3})
+        self.assertEqual(similar_items(self.items[0].pk, limit=2), [self.items[1], self.items[2]])
+        self.assertEqual(recommended_items(self.users[2]), [self.items[1], self.items[2]])
+
+    def test_incremental_build_only_touches_new_activity(self):
+        build(full=True)
+        self.book(self.users[2], self.items[3])
+        self.assertEqual(build(), {'items': 2, 'users': 1})
+        self.assertEqual(similar_items(self.items[3].pk), [self.items[0]])
+
+class GeoSearchTest(TestCase):
+    def setUp(self):
+        self.enterContext(buffered_actions())
+        owner = User.objects.create(username='owner')
+        places = {'CBD': (-1.2864, 36.8172), 'Westlands': (-1.2676, 36.8108), 'Karen': (-1.3197, 36.7073), 'Mombasa': (-4.0435, 39.6682), 'Unknown': (None, None)}
+        self.items = {
+            title: RentalItem.objects.create(owner=owner, type='item', title=title, description='x', base_price=Decimal('10.00'), latitude=lat, longitude=lng, verified=True)
+            for title, (lat, lng) in places.items()
+        }
+
+    def test_encode(self):
+        self.assertEqual(encode(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(self.items['CBD'].geohash, encode(-1.2864, 36.8172))
+        self.assertEqual(self.items['Unknown'].geohash, '')
+
+    def test_covering_cells_wrap_the_antimeridian(self):
+        cells = covering_cells(0, 179.99, 5)
+        self.assertIn('xbpbp', cells)
+        self.assertIn('80000', cells)
+
+    def test_nearby_filters_and_sorts_by_distance(self):
+        results = list(nearby(RentalItem.objects.all(), -1.2864, 36.8172, 15).order_by('distance'))
+        self.assertEqual([item.title for item in results], ['CBD', 'Westlands', 'Karen'])
+        self.assertAlmostEqual(results[1].distance, 2.2, delta=0.1)
+        self.assertEqual([item.title for item in nearby(RentalItem.objects.all(), -1.2864, 36.8172, 5)], ['CBD', 'Westlands'])
+
+    def test_search_view(self):
+        response = self.client.get('/search/', {'lat': '-1.2676', 'lng': '36.8108', 'radius': '25'})
+        self.assertEqual([item.title for item in response.context['results']], ['Westlands', 'CBD', 'Karen'])
+        response = self.client.get('/search/', {'lat': 'x', 'lng': '36.8108'})
+        self.assertEqual(len(response.context['results']), 5)
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BenchmarkCommandTest(TestCase):
+    def setUp(self):
+        self.enterContext(buffered_actions())
+
+    def test_seeds_and_measures_every_core_view(self):
+        call_command('seed_benchmark', users=6, items=4, booked_periods=3, posts=3, likes=2, comments=2, chats=1, chat_length=5, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            call_command('benchmark', iterations=2, warmup=0, output=output, stdout=StringIO())
+            with open(output) as f:
+                results = json.load(f)['results']
+        self.assertEqual(set(results), {'home', 'search', 'listing', 'booking', 'dashboard', 'chat'})
+        self.assertEqual({r['status'] for r in results.values()}, {200})
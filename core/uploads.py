@@ -0,0 +1,82 @@
+import hashlib
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler, StopFutureHandlers, StopUpload, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import gettext as _
+
+MB = 1024 * 1024
+DEFAULT_LIMITS = {
+    'image': {'image/jpeg': 5 * MB, 'image/png': 5 * MB},
+    'payment_proof': {'image/jpeg': 5 * MB, 'image/png': 5 * MB},
+    'media': {'image/jpeg': 10 * MB, 'image/png': 10 * MB, 'video/mp4': 50 * MB},
+}
+# Room for the other form fields and multipart framing around a file.
+FORM_OVERHEAD = 64 * 1024
+
+LIMITS = getattr(settings, 'UPLOAD_LIMITS', DEFAULT_LIMITS)
+
+def sniff(head):
+    # The declared content type is whatever the client says; the first bytes are not.
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[4:8] == b'ftyp':
+        return 'video/mp4'
+    return None
+
+def upload_errors(request):
+    request.FILES  # errors are recorded while the body is parsed
+    return getattr(request, 'upload_errors', {})
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    # Streams files for the fields in LIMITS to a temporary file while hashing them, and
+    # rejects them by sniffed type and size as soon as the data shows it. Other fields fall
+    # through to the next handler.
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_size = content_length
+
+    def new_file(self, field_name, *args, **kwargs):
+        # Django closes every handler's `file` when an upload is skipped; drop the
+        # reference to the previous, already completed file first.
+        self.__dict__.pop('file', None)
+        self.allowed = LIMITS.get(field_name)
+        if self.allowed is None:
+            return
+        limit = max(self.allowed.values())
+        if self.request_size > limit + FORM_OVERHEAD:
+            # Refuse before reading the body at all; nothing after this file is parsed.
+            self.reject(field_name, _('File too large. The limit is %s.') % filesizeformat(limit))
+            raise StopUpload(connection_reset=True)
+        super().new_file(field_name, *args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.kind = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.allowed is None:
+            return raw_data
+        if self.kind is None:
+            self.kind = sniff(raw_data[:12])
+            if self.kind not in self.allowed:
+                self.reject(self.field_name, _('Unsupported file type.'))
+                raise SkipFile()
+        if start + len(raw_data) > self.allowed[self.kind]:
+            self.reject(self.field_name, _('File too large. The limit is %s.') % filesizeformat(self.allowed[self.kind]))
+            raise SkipFile()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.allowed is None:
+            return None
+        file = super().file_complete(file_size)
+        file.content_type = self.kind
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+    def reject(self, field_name, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[field_name] = message
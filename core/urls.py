@@ -1,7 +1,8 @@
 from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
 from .views import (HomeView, SearchView, ListingView, ProfileView, BookingView, signup, payment, notifications,
-                    like_post, add_comment, AddListingView, AddPostView, add_review, chat, DashboardView)
+                    like_post, add_comment, post_comments, AddListingView, AddPostView, add_review, chat, inbox, DashboardView, metrics,
+                    price_quote)
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
@@ -10,15 +11,19 @@ urlpatterns = [
     path('profile/', ProfileView.as_view(), name='profile'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
     path('signup/', signup, name='signup'),
-    path('login/', LoginView.as_view(template_name='login.html'), name='login'),
+    path('login/', LoginView.as_view(template_name='core/login.html'), name='login'),
     path('logout/', LogoutView.as_view(next_page='home'), name='logout'),
     path('booking/<int:item_id>/', BookingView.as_view(), name='booking'),
+    path('quote/<int:item_id>/', price_quote, name='quote'),
     path('payment/<int:reservation_id>/', payment, name='payment'),
     path('notifications/', notifications, name='notifications'),
     path('like/<int:post_id>/', like_post, name='like_post'),
     path('comment/<int:post_id>/', add_comment, name='add_comment'),
+    path('comments/<int:post_id>/', post_comments, name='post_comments'),
     path('add-listing/', AddListingView.as_view(), name='add_listing'),
     path('add-post/', AddPostView.as_view(), name='add_post'),
     path('review/<int:item_id>/', add_review, name='add_review'),
+    path('chat/', inbox, name='inbox'),
     path('chat/<int:user_id>/', chat, name='chat'),
+    path('metrics/', metrics, name='metrics'),
 ]
\ No newline at end of file
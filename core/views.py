@@ -1,52 +1,70 @@
+import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, FormView, CreateView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.urls import reverse, reverse_lazy
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, Http404
 from django.contrib import messages
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q, Count
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import datetime, timedelta
-from .models import RentalItem, SocialPost, Reservation, UserProfile, Review, UserAction, Message, Badge, UserBadge
+from decimal import ROUND_HALF_UP
+from .models import RentalItem, SocialPost, Comment, Reservation, UserProfile, Review, UserAction, Message, UserBadge
 from .forms import SignUpForm, ReservationForm, RentalItemForm, SocialPostForm, ReviewForm
+from .availability import filter_available, booked_days, day_bounds
+from .booking import reserve, BookingConflict
+from .feed import feed_queryset, keyset_page, top_rated, recommended_for, COMMENT_PAGE_SIZE
+from .search import search_backend
+from .currency import convert, rate, CENT
+from .pricing import quote, quote_many, MAX_QUOTE_RANGES
+from notifications.dispatch import dispatch
+from notifications.notify import notify, mark_read as mark_notifications_read, unread_count
+from .chat import history, mark_read, message_payload, inbox as chat_inbox
+from .likes import has_liked, like, unlike, like_count, liked_post_ids
+from .events import record_action
+from .gamification import award_points
+from .counters import view_counter
+from .recommendations import similar_items
+from .geo import nearby, parse_point, parse_radius, RADIUS_CHOICES, DEFAULT_RADIUS_KM
+from .analytics import owner_summary, top_listings, DASHBOARD_DAYS
+from .metrics import registry
+from .uploads import upload_errors
+from .cache import listing_cache, listing_key, related_key, reviewed_key, RELATED_TIMEOUT
 from django.contrib.auth.models import User
 
-def award_points(user, points, action):
-    profile = user.profile
-    profile.points += points
-    profile.save()
-    badges = Badge.objects.filter(points_required__lte=profile.points).exclude(userbadge__user=user)
-    for badge in badges:
-        UserBadge.objects.create(user=user, badge=badge)
-        messages.success(user.request, _(f"Badge earned: {badge.name}!"))
-
 class HomeView(ListView):
     model = SocialPost
-    template_name = 'home.html'
+    template_name = 'core/home.html'
     context_object_name = 'posts'
-    ordering = ['-created_at']
     paginate_by = 10
 
+    def get_queryset(self):
+        return feed_queryset()
+
+    def paginate_queryset(self, queryset, page_size):
+        posts, self.next_cursor = keyset_page(queryset, self.request.GET.get('cursor'), page_size)
+        return None, None, posts, self.next_cursor is not None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['items'] = RentalItem.objects.filter(type='item', verified=True).order_by('-rating')[:6]
-        context['services'] = RentalItem.objects.filter(type='service', verified=True).order_by('-rating')[:6]
+        context['next_cursor'] = self.next_cursor
+        context['liked_ids'] = liked_post_ids(self.request.user, [post.pk for post in context['posts']])
+        context['items'] = top_rated('item')
+        context['services'] = top_rated('service')
         user_currency = self.request.user.profile.currency if self.request.user.is_authenticated else settings.DEFAULT_CURRENCY
         context['user_currency'] = user_currency
         if self.request.user.is_authenticated:
-            actions = UserAction.objects.filter(user=self.request.user).values('details').annotate(count=Count('id'))
-            prefs = {a['details'].get('type', 'item'): a['count'] for a in actions if 'type' in a['details']}
-            top_type = max(prefs, key=prefs.get, default='item') if prefs else 'item'
-            context['recommended'] = RentalItem.objects.filter(type=top_type, verified=True).exclude(owner=self.request.user).order_by('-rating')[:4]
+            context['recommended'] = recommended_for(self.request.user)
         return context
 
 class SearchView(ListView):
     model = RentalItem
-    template_name = 'search.html'
+    template_name = 'core/search.html'
     context_object_name = 'results'
     paginate_by = 12
 
@@ -55,15 +73,25 @@ class SearchView(ListView):
         type_filter = self.request.GET.get('type', '')
         min_price = float(self.request.GET.get('min_price', 0))
         max_price = float(self.request.GET.get('max_price', 10000))
-        UserAction.objects.create(user=self.request.user if self.request.user.is_authenticated else None,
-                                 action='search', details={'query': query, 'type': type_filter})
+        record_action(self.request.user if self.request.user.is_authenticated else None,
+                      'search', {'query': query, 'type': type_filter})
         queryset = RentalItem.objects.filter(verified=True)
-        if query:
-            queryset = queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
         if type_filter in ['item', 'service']:
             queryset = queryset.filter(type=type_filter)
+        available_from = parse_date(self.request.GET.get('available_from', ''))
+        available_to = parse_date(self.request.GET.get('available_to', '')) or available_from
+        if available_from and available_to >= available_from:
+            queryset = filter_available(queryset, *day_bounds(available_from, available_to))
         queryset = queryset.filter(base_price__gte=min_price, base_price__lte=max_price)
-        return queryset.order_by('-rating')
+        point = parse_point(self.request.GET.get('lat'), self.request.GET.get('lng'))
+        if point:
+            queryset = nearby(queryset, *point, parse_radius(self.request.GET.get('radius')))
+        queryset = search_backend().search(queryset, query) if query else queryset.order_by('-rating')
+        # Near-me searches sort by distance unless a text query ranks them or 'rating' is asked for.
+        sort = self.request.GET.get('sort', '')
+        if point and (sort == 'distance' or not query and sort != 'rating'):
+            queryset = queryset.order_by('distance', '-rating')
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -71,36 +99,76 @@ class SearchView(ListView):
         context['type_filter'] = self.request.GET.get('type', '')
         context['min_price'] = self.request.GET.get('min_price', '')
         context['max_price'] = self.request.GET.get('max_price', '')
+        context['available_from'] = self.request.GET.get('available_from', '')
+        context['available_to'] = self.request.GET.get('available_to', '')
+        for name in ('lat', 'lng', 'radius', 'sort'):
+            context[name] = self.request.GET.get(name, '')
+        context['radius'] = context['radius'] or str(DEFAULT_RADIUS_KM)
+        context['radius_choices'] = RADIUS_CHOICES
         context['user_currency'] = self.request.user.profile.currency if self.request.user.is_authenticated else settings.DEFAULT_CURRENCY
         return context
 
+def cached_listing(pk):
+    item = listing_cache.get_or_set(listing_key(pk), lambda: RentalItem.objects.select_related('owner').filter(pk=pk).first())
+    if item is None:
+        raise Http404(_("Listing not found."))
+    return item
+
 class ListingView(DetailView):
     model = RentalItem
-    template_name = 'listing.html'
+    template_name = 'core/listing.html'
     context_object_name = 'item'
 
     def get(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        self.object.views += 1
-        self.object.save()
+        view_counter.incr(self.kwargs['pk'])
+        if request.user.is_authenticated:
+            record_action(request.user, 'view_listing', {'item_id': self.kwargs['pk']})
         return super().get(request, *args, **kwargs)
 
+    def get_object(self, queryset=None):
+        return cached_listing(self.kwargs['pk'])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        item = self.object
         user_currency = self.request.user.profile.currency if self.request.user.is_authenticated else settings.DEFAULT_CURRENCY
-        context['converted_price'] = float(self.object.base_price) * settings.EXCHANGE_RATES[self.object.base_currency][user_currency]
+        context['converted_price'] = convert(item.base_price, item.base_currency, user_currency)
         context['user_currency'] = user_currency
-        context['related'] = RentalItem.objects.filter(type=self.object.type, verified=True).exclude(id=self.object.id).order_by('-rating')[:4]
-        context['reviews'] = Review.objects.filter(item=self.object).order_by('-created_at')[:5]
+        related = listing_cache.get_or_set(listing_key(item.pk, 'related'), lambda: similar_items(item.pk), RELATED_TIMEOUT)
+        if not related:
+            # No co-occurrence data for this listing yet: fall back to top-rated of its type.
+            related = listing_cache.get_or_set(
+                related_key(item.type),
+                lambda: list(RentalItem.objects.filter(type=item.type, verified=True).order_by('-rating')[:5]),
+                RELATED_TIMEOUT,
+            )
+        context['related'] = [r for r in related if r.pk != item.pk][:4]
+        context['reviews'] = listing_cache.get_or_set(
+            listing_key(item.pk, 'reviews'),
+            lambda: list(Review.objects.filter(item=item).select_related('reviewer').order_by('-created_at')[:5]),
+        )
+        context['availability_json'] = self.availability_json(item)
         if self.request.user.is_authenticated:
-            context['can_review'] = not Review.objects.filter(reviewer=self.request.user, item=self.object).exists()
+            context['can_review'] = listing_cache.get_or_set(
+                reviewed_key(item.pk, self.request.user.pk),
+                lambda: not Review.objects.filter(reviewer=self.request.user, item=item).exists(),
+            )
             context['review_form'] = ReviewForm()
-            context['chat_available'] = self.object.owner != self.request.user
+            context['chat_available'] = item.owner_id != self.request.user.pk
         return context
 
+    def availability_json(self, item):
+        today = timezone.localdate()
+        month_start = today.replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return listing_cache.get_or_set(
+            listing_key(item.pk, f'booked:{month_start:%Y-%m}'),
+            lambda: json.dumps(booked_days(item, month_start, month_end)),
+        )
+
 class ProfileView(LoginRequiredMixin, DetailView):
     model = User
-    template_name = 'profile.html'
+    template_name = 'core/profile.html'
     context_object_name = 'profile'
 
     def get_object(self):
@@ -120,16 +188,16 @@ def signup(request):
         form = SignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
-            UserAction.objects.create(user=user, action='signup')
-            award_points(user, 10, 'signup')
+            record_action(user, 'signup')
+            award_points(user, 10, 'signup', request)
             messages.success(request, _("Account created successfully! Please log in."))
             return redirect('login')
     else:
         form = SignUpForm()
-    return render(request, 'signup.html', {'form': form})
+    return render(request, 'core/signup.html', {'form': form})
 
 class BookingView(LoginRequiredMixin, FormView):
-    template_name = 'booking.html'
+    template_name = 'core/booking.html'
     form_class = ReservationForm
     success_url = reverse_lazy('home')
 
@@ -138,47 +206,32 @@ class BookingView(LoginRequiredMixin, FormView):
         item = get_object_or_404(RentalItem, id=self.kwargs['item_id'], verified=True)
         context['item'] = item
         user_currency = self.request.user.profile.currency
-        base_price = float(item.base_price)
-        if item.pricing_rules:
-            today = datetime.now().date()
-            start_date_str = self.request.POST.get('start_date', today.isoformat() + 'T00:00')
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%dT%H:%M').date()
-            if start_date.weekday() >= 5 and 'weekend' in item.pricing_rules:
-                base_price *= item.pricing_rules['weekend']
-        context['converted_price'] = base_price * settings.EXCHANGE_RATES[item.base_currency][user_currency]
+        context['converted_price'] = convert(item.base_price, item.base_currency, user_currency)
         context['user_currency'] = user_currency
+        form = context['form']
+        if form.is_bound and form.is_valid():
+            context['quote'] = quote(item, form.cleaned_data['start_date'], form.cleaned_data['end_date'])
         return context
 
     def form_valid(self, form):
         item = get_object_or_404(RentalItem, id=self.kwargs['item_id'], verified=True)
         start_date = form.cleaned_data['start_date']
         end_date = form.cleaned_data['end_date']
-        for date in item.availability:
-            d = datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=start_date.tzinfo)
-            if start_date <= d <= end_date and item.availability[date] == 'booked':
-                messages.error(self.request, _("This item is not available for the selected dates."))
-                return self.form_invalid(form)
         reservation = form.save(commit=False)
         reservation.renter = self.request.user
         reservation.item = item
-        duration = (end_date - start_date).total_seconds() / 86400
-        base_price = float(item.base_price)
-        if item.pricing_rules and start_date.weekday() >= 5 and 'weekend' in item.pricing_rules:
-            base_price *= item.pricing_rules['weekend']
-        reservation.total_cost = base_price * max(1, duration)
-        reservation.save()
-        current = start_date
-        while current <= end_date:
-            item.availability[current.strftime('%Y-%m-%d')] = 'booked'
-            current += timedelta(days=1)
-        item.save()
-        UserAction.objects.create(user=self.request.user, action='booking', details={'item': item.title})
-        award_points(self.request.user, 20, 'booking')
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'user_{item.owner.id}',
-            {'type': 'send_notification', 'message': f'{self.request.user.username} booked {item.title}'}
-        )
+        reservation.total_cost = quote(item, start_date, end_date)['total']
+        try:
+            reserve(item, reservation, start_date, end_date)
+        except BookingConflict as e:
+            messages.error(self.request, e.args[0])
+            response = self.form_invalid(form)
+            response.status_code = 409
+            return response
+        record_action(self.request.user, 'booking', {'item': item.title, 'item_id': item.pk})
+        award_points(self.request.user, 20, 'booking', self.request)
+        notify(item.owner_id, 'booking', f'{self.request.user.username} booked {item.title}',
+               url=reverse('listing', args=[item.pk]), group_key=f'booking:{item.pk}')
         messages.success(self.request, _("Booking successful! Please upload payment proof."))
         return redirect('payment', reservation_id=reservation.id)
 
@@ -188,91 +241,154 @@ def payment(request, reservation_id):
     if reservation.status != 'pending':
         messages.error(request, _("This reservation cannot be modified."))
         return redirect('profile')
+    for error in upload_errors(request).values():
+        messages.error(request, error)
     if request.method == 'POST' and 'payment_proof' in request.FILES:
         try:
             reservation.payment_proof = request.FILES['payment_proof']
             reservation.status = 'confirmed'
             reservation.save()
-            UserAction.objects.create(user=request.user, action='payment', details={'reservation': reservation.id})
-            award_points(request.user, 15, 'payment')
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f'user_{reservation.item.owner.id}',
-                {'type': 'send_notification', 'message': f'Payment confirmed for {reservation.item.title}'}
-            )
+            record_action(request.user, 'payment', {'reservation': reservation.id})
+            award_points(request.user, 15, 'payment', request)
+            notify(reservation.item.owner_id, 'payment', f'Payment confirmed for {reservation.item.title}',
+                   url=reverse('listing', args=[reservation.item_id]), group_key=f'payment:{reservation.item_id}')
             messages.success(request, _("Payment proof uploaded successfully!"))
             return redirect('profile')
         except Exception as e:
             messages.error(request, f"Error uploading payment proof: {str(e)}")
     user_currency = request.user.profile.currency
-    converted_cost = float(reservation.total_cost) * settings.EXCHANGE_RATES[reservation.item.base_currency][user_currency]
-    return render(request, 'booking.html', {
+    converted_cost = convert(reservation.total_cost, reservation.item.base_currency, user_currency)
+    return render(request, 'core/booking.html', {
         'reservation': reservation,
         'converted_cost': converted_cost,
         'user_currency': user_currency
     })
 
+def price_quote(request, item_id):
+    # Prices many ranges in one request, e.g. a night's price for each day of a calendar.
+    item = cached_listing(item_id)
+    if not item.verified:
+        raise Http404(_("Listing not found."))
+    ranges = []
+    for value in request.GET.getlist('range')[:MAX_QUOTE_RANGES]:
+        start, sep, end = value.partition('/')
+        start, end = parse_quote_time(start), parse_quote_time(end)
+        if start is None or end is None or end <= start:
+            return JsonResponse({'error': f'Invalid range: {value}'}, status=400)
+        ranges.append((start, end))
+    currency = request.GET.get('currency') or (request.user.profile.currency if request.user.is_authenticated else settings.DEFAULT_CURRENCY)
+    try:
+        factor = rate(item.base_currency, currency)
+    except KeyError:
+        return JsonResponse({'error': f'Unknown currency: {currency}'}, status=400)
+    quotes = []
+    for (start, end), q in zip(ranges, quote_many(item, ranges)):
+        quotes.append({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'units': q['units'],
+            'unit': q['unit'],
+            'total': str((q['total'] * factor).quantize(CENT, ROUND_HALF_UP)),
+        })
+    return JsonResponse({'currency': currency, 'quotes': quotes})
+
+def parse_quote_time(value):
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, datetime.min.time()) if day else None
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
 @login_required
 def notifications(request):
-    return render(request, 'notifications.html')
+    if request.method == 'POST':
+        mark_notifications_read(request.user.pk)
+        return redirect('notifications')
+    latest = list(request.user.notifications.order_by('-id')[:50])
+    return render(request, 'core/notifications.html', {'notifications': latest, 'unread_count': unread_count(request.user.pk)})
 
 @login_required
 def like_post(request, post_id):
     if request.method != 'POST':
         return HttpResponseBadRequest("Invalid request method")
-    post = get_object_or_404(SocialPost, id=post_id)
-    liked = request.user in post.likes.all()
-    if liked:
-        post.likes.remove(request.user)
-    else:
-        post.likes.add(request.user)
-        award_points(request.user, 5, 'like')
-    return JsonResponse({'likes': post.likes.count(), 'liked': not liked})
+    post = get_object_or_404(SocialPost.objects.only('id'), id=post_id)
+    now_liked = not has_liked(request.user, post.pk)
+    if not now_liked:
+        unlike(request.user, post.pk)
+    elif like(request.user, post.pk):
+        award_points(request.user, 5, 'like', request)
+    likes = like_count(post.pk)
+    if request.headers.get('HX-Request'):
+        return HttpResponse(likes)
+    return JsonResponse({'likes': likes, 'liked': now_liked})
 
 @login_required
 def add_comment(request, post_id):
     if request.method != 'POST':
         return HttpResponseBadRequest("Invalid request method")
-    post = get_object_or_404(SocialPost, id=post_id)
+    post = get_object_or_404(SocialPost.objects.only('id', 'user_id'), id=post_id)
     comment_text = request.POST.get('comment', '').strip()
     if not comment_text:
         return JsonResponse({'error': 'Comment cannot be empty'}, status=400)
-    comment = {'user': request.user.username, 'text': comment_text, 'date': datetime.now().isoformat()}
-    post.comments.append(comment)
-    post.save()
-    award_points(request.user, 10, 'comment')
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f'user_{post.user.id}',
-        {'type': 'send_notification', 'message': f'{request.user.username} commented on your post'}
+    with transaction.atomic():
+        comment = Comment.objects.create(post=post, user=request.user, text=comment_text[:500])
+        SocialPost.objects.filter(pk=post.pk).update(comment_count=F('comment_count') + 1)
+    award_points(request.user, 10, 'comment', request)
+    if post.user_id != request.user.pk:
+        notify(post.user_id, 'comment', f'{request.user.username} commented on your post',
+               url=reverse('home'), group_key=f'comment:{post.pk}')
+    return JsonResponse({'comment': comment_json(comment)})
+
+def post_comments(request, post_id):
+    comments, next_cursor = keyset_page(
+        Comment.objects.filter(post_id=post_id).select_related('user').order_by('-created_at', '-id'),
+        request.GET.get('cursor'),
+        COMMENT_PAGE_SIZE,
     )
-    return JsonResponse({'comment': comment})
+    return JsonResponse({'comments': [comment_json(c) for c in comments], 'next': next_cursor})
+
+def comment_json(comment):
+    return {'user': comment.user.username, 'text': comment.text, 'date': comment.created_at.isoformat()}
+
+class UploadErrorsMixin:
+    # Files rejected by the upload handler never reach request.FILES; report why.
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        for field, error in upload_errors(self.request).items():
+            if field in form.fields:
+                form.add_error(field, error)
+        return form
 
-class AddListingView(LoginRequiredMixin, CreateView):
+class AddListingView(LoginRequiredMixin, UploadErrorsMixin, CreateView):
     model = RentalItem
     form_class = RentalItemForm
-    template_name = 'add_listing.html'
+    template_name = 'core/add_listing.html'
     success_url = reverse_lazy('profile')
 
     def form_valid(self, form):
         form.instance.owner = self.request.user
         response = super().form_valid(form)
-        UserAction.objects.create(user=self.request.user, action='add_listing', details={'title': form.instance.title})
-        award_points(self.request.user, 25, 'add_listing')
+        record_action(self.request.user, 'add_listing', {'title': form.instance.title})
+        award_points(self.request.user, 25, 'add_listing', self.request)
         messages.success(self.request, _("Listing added successfully! It will be visible once verified."))
         return response
 
-class AddPostView(LoginRequiredMixin, CreateView):
+class AddPostView(LoginRequiredMixin, UploadErrorsMixin, CreateView):
     model = SocialPost
     form_class = SocialPostForm
-    template_name = 'add_post.html'
+    template_name = 'core/add_post.html'
     success_url = reverse_lazy('home')
 
     def form_valid(self, form):
         form.instance.user = self.request.user
         response = super().form_valid(form)
-        UserAction.objects.create(user=self.request.user, action='add_post', details={'caption': form.instance.caption[:50]})
-        award_points(self.request.user, 15, 'add_post')
+        record_action(self.request.user, 'add_post', {'caption': form.instance.caption[:50]})
+        award_points(self.request.user, 15, 'add_post', self.request)
         messages.success(self.request, _("Post shared successfully!"))
         return response
 
@@ -289,8 +405,8 @@ def add_review(request, item_id):
             review.reviewer = request.user
             review.item = item
             review.save()
-            UserAction.objects.create(user=request.user, action='review', details={'item': item.title, 'rating': review.rating})
-            award_points(request.user, 20, 'review')
+            record_action(request.user, 'review', {'item': item.title, 'item_id': item.pk, 'rating': review.rating})
+            award_points(request.user, 20, 'review', request)
             messages.success(request, _("Review submitted successfully!"))
             return redirect('listing', pk=item_id)
     return redirect('listing', pk=item_id)
@@ -298,25 +414,38 @@ def add_review(request, item_id):
 @login_required
 def chat(request, user_id):
     other_user = get_object_or_404(User, id=user_id)
-    messages_list = Message.objects.filter(
-        Q(sender=request.user, receiver=other_user) | Q(sender=other_user, receiver=request.user)
-    ).order_by('timestamp')
     if request.method == 'POST':
         content = request.POST.get('content', '').strip()
         if content:
-            Message.objects.create(sender=request.user, receiver=other_user, content=content)
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f'chat_{other_user.id}',
-                {'type': 'chat_message', 'message': {'sender': request.user.username, 'content': content, 'timestamp': datetime.now().isoformat()}}
-            )
+            message = Message.objects.create(sender=request.user, receiver=other_user, content=content)
+            dispatch(f'chat_{other_user.id}', {'type': 'chat_message', 'message': message_payload(message)})
             return redirect('chat', user_id=user_id)
-    Message.objects.filter(receiver=request.user, sender=other_user, read=False).update(read=True)
-    return render(request, 'chat.html', {'other_user': other_user, 'messages': messages_list})
+    messages_list, next_cursor = history(request.user, other_user, request.GET.get('cursor'))
+    mark_read(request.user, messages_list)
+    if request.GET.get('cursor'):
+        return JsonResponse({'messages': [message_payload(m) for m in messages_list], 'next': next_cursor})
+    return render(request, 'core/chat.html', {
+        'other_user': other_user,
+        'chat_messages': messages_list,
+        'next_cursor': next_cursor,
+        'last_id': messages_list[-1].pk if messages_list else 0,
+    })
+
+@login_required
+def inbox(request):
+    return JsonResponse({'conversations': [
+        {
+            'user': entry['user'].username,
+            'url': reverse('chat', args=[entry['user'].pk]),
+            'last_message': message_payload(entry['last_message']),
+            'unread': entry['unread'],
+        }
+        for entry in chat_inbox(request.user)
+    ]})
 
 class DashboardView(LoginRequiredMixin, DetailView):
     model = User
-    template_name = 'dashboard.html'
+    template_name = 'core/dashboard.html'
     context_object_name = 'user'
 
     def get_object(self):
@@ -324,9 +453,27 @@ class DashboardView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        listings = self.request.user.rentalitem_set.all()
-        context['total_views'] = sum(l.views for l in listings)
-        context['total_bookings'] = Reservation.objects.filter(item__owner=self.request.user).count()
-        context['average_rating'] = sum(l.rating for l in listings if l.review_count) / max(1, listings.filter(review_count__gt=0).count())
+        user = self.request.user
+        currency = user.profile.currency
+        totals, series = owner_summary(user, currency, DASHBOARD_DAYS)
+        # Views still buffered in the counter have not reached the rollups yet.
+        pending = sum(view_counter.pending(user.rentalitem_set.values_list('id', flat=True)).values())
+        totals['views'] += pending
+        series[-1]['views'] += pending
+        peak = max(day['views'] for day in series) or 1
+        for day in series:
+            day['height'] = round(day['views'] * 100 / peak)
+        context.update({
+            'totals': totals,
+            'series': series,
+            'top_listings': top_listings(user, DASHBOARD_DAYS),
+            'user_currency': currency,
+            'dashboard_days': DASHBOARD_DAYS,
+        })
         context['recent_actions'] = UserAction.objects.filter(user=self.request.user).order_by('-timestamp')[:10]
-        return context
\ No newline at end of file
+        return context
+
+def metrics(request):
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4')
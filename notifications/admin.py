@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import Notification
 
-# Register your models here.
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'message', 'count', 'read', 'created_at')
+    list_filter = ('kind', 'read')
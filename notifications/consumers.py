@@ -1,6 +1,10 @@
 import json
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from datetime import datetime
+from django.contrib.auth.models import User
+from core.chat import message_writer, message_payload, replay
+from .notify import unread_count, unread_since, payload
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -11,13 +15,22 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         self.group_name = f'user_{self.user.id}'
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        # Anything stored while the user was away: unread rows newer than the client's cursor.
+        after = parse_qs(self.scope.get('query_string', b'').decode()).get('after', [''])[0]
+        count, missed = await database_sync_to_async(self.pending)(int(after) if after.isdigit() else 0)
+        await self.send(text_data=json.dumps({'type': 'unread', 'count': count}))
+        for notification in missed:
+            await self.send(text_data=json.dumps({'type': 'notification', **payload(notification)}))
+
+    def pending(self, after):
+        return unread_count(self.user.id), unread_since(self.user.id, after)
 
     async def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def send_notification(self, event):
-        await self.send(text_data=json.dumps({'message': event['message']}))
+        await self.send(text_data=json.dumps({**event, 'type': 'notification'}))
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -26,26 +39,51 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
         self.user = self.scope['user']
         self.group_name = f'chat_{self.user.id}'
+        self.known_receivers = set()
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        after = parse_qs(self.scope.get('query_string', b'').decode()).get('after', [''])[0]
+        if after.isdigit():
+            for message in await database_sync_to_async(replay)(self.user, int(after)):
+                await self.send(text_data=json.dumps({'type': 'message', 'message': message_payload(message)}))
 
     async def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        await self.channel_layer.group_send(
-            f'chat_{data["receiver"]}',
-            {
-                'type': 'chat_message',
-                'message': {
-                    'sender': self.user.username,
-                    'content': data['content'],
-                    'timestamp': datetime.now().isoformat()
-                }
-            }
-        )
+        try:
+            data = json.loads(text_data)
+            receiver_id = int(data['receiver'])
+            content = str(data['content']).strip()[:1000]
+        except (ValueError, TypeError, KeyError):
+            await self.send_error(None, 'Malformed message')
+            return
+        client_id = data.get('client_id')
+        if not content:
+            await self.send_error(client_id, 'Message cannot be empty')
+            return
+        if receiver_id == self.user.id or not await self.receiver_exists(receiver_id):
+            await self.send_error(client_id, 'Unknown receiver')
+            return
+        try:
+            message = await message_writer.save(self.user, receiver_id, content)
+        except Exception:
+            await self.send_error(client_id, 'Message could not be saved')
+            return
+        payload = message_payload(message)
+        await self.send(text_data=json.dumps({'type': 'ack', 'client_id': client_id, 'message': payload}))
+        await self.channel_layer.group_send(f'chat_{receiver_id}', {'type': 'chat_message', 'message': payload})
+
+    async def receiver_exists(self, receiver_id):
+        if receiver_id not in self.known_receivers:
+            if not await database_sync_to_async(User.objects.filter(pk=receiver_id, is_active=True).exists)():
+                return False
+            self.known_receivers.add(receiver_id)
+        return True
+
+    async def send_error(self, client_id, error):
+        await self.send(text_data=json.dumps({'type': 'error', 'client_id': client_id, 'error': error}))
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event['message']))
\ No newline at end of file
+        await self.send(text_data=json.dumps({'type': 'message', 'message': event['message']}))
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+class Dispatcher:
+    # Request threads only enqueue; one background thread per process owns an event loop
+    # and does the channel-layer round trips, so a slow or dead layer never blocks a view.
+    def __init__(self, max_pending=10000, batch_size=100, layer=None):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.layer = layer
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.worker = None
+        self.worker_pid = None
+
+    def send(self, group, event):
+        self.ensure_worker()
+        try:
+            self.queue.put_nowait((group, event, time.monotonic()))
+        except queue.Full:
+            # Stored notifications are replayed on reconnect; shedding the push is safe.
+            registry.incr('channel_dispatch_total', outcome='dropped')
+            return False
+        return True
+
+    def ensure_worker(self):
+        # Re-spawn after a fork: the parent's thread does not exist in the child.
+        if self.worker_pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.lock:
+            if self.worker_pid == os.getpid() and self.worker.is_alive():
+                return
+            if self.worker_pid != os.getpid():
+                self.queue = queue.Queue(self.max_pending)
+            self.worker = threading.Thread(target=self.run, name='channel-dispatch', daemon=True)
+            self.worker_pid = os.getpid()
+            self.worker.start()
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            loop.run_until_complete(self.deliver(batch))
+
+    async def deliver(self, batch):
+        layer = self.layer or get_channel_layer()
+        results = await asyncio.gather(*[layer.group_send(group, event) for group, event, _ in batch], return_exceptions=True)
+        now = time.monotonic()
+        for (group, _, queued_at), result in zip(batch, results):
+            if isinstance(result, Exception):
+                registry.incr('channel_dispatch_total', outcome='failed')
+                logger.warning('Channel send to %s failed: %r', group, result)
+            else:
+                registry.incr('channel_dispatch_total', outcome='sent')
+                registry.observe('channel_dispatch_delay_ms', (now - queued_at) * 1000)
+
+config = getattr(settings, 'NOTIFICATION_DISPATCH', {})
+dispatcher = Dispatcher(max_pending=config.get('MAX_PENDING', 10000), batch_size=config.get('BATCH_SIZE', 100))
+
+def dispatch(group, event):
+    # Nothing is pushed for a write that ends up rolled back.
+    transaction.on_commit(lambda: dispatcher.send(group, event))
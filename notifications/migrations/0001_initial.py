@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('booking', 'Booking'), ('payment', 'Payment'), ('comment', 'Comment'), ('badge', 'Badge'), ('listing', 'Listing')], max_length=10)),
+                ('message', models.CharField(max_length=255)),
+                ('url', models.CharField(blank=True, max_length=200)),
+                ('group_key', models.CharField(blank=True, max_length=64)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-id'], name='notif_user_idx'), models.Index(condition=models.Q(('read', False)), fields=['user', 'group_key'], name='notif_unread_group_idx')],
+            },
+        ),
+    ]
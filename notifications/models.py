@@ -1,3 +1,39 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.translation import ngettext
 
-# Create your models here.
+class Notification(models.Model):
+    KINDS = [
+        ('booking', 'Booking'),
+        ('payment', 'Payment'),
+        ('comment', 'Comment'),
+        ('badge', 'Badge'),
+        ('listing', 'Listing'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    message = models.CharField(max_length=255)
+    url = models.CharField(max_length=200, blank=True)
+    # Unread notifications sharing a group key are folded into one row instead of piling up.
+    group_key = models.CharField(max_length=64, blank=True)
+    count = models.PositiveIntegerField(default=1)
+    read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='notif_user_idx'),
+            models.Index(fields=['user', 'group_key'], condition=models.Q(read=False), name='notif_unread_group_idx'),
+        ]
+
+    @property
+    def text(self):
+        if self.count == 1:
+            return self.message
+        return ngettext('%(message)s and %(count)d more', '%(message)s and %(count)d more', self.count - 1) % {
+            'message': self.message, 'count': self.count - 1,
+        }
+
+    def __str__(self):
+        return f"{self.user.username}: {self.text}"
@@ -0,0 +1,107 @@
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import Truncator
+from .dispatch import dispatcher
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_TIMEOUT = 3600
+REPLAY_LIMIT = 50
+FANOUT_BATCH_SIZE = 500
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+def cache_call(method, *args):
+    # The unread badge is a convenience: a cache outage falls back to the table and must
+    # not fail the write that triggered it.
+    try:
+        return getattr(cache, method)(*args)
+    except Exception:
+        logger.warning('Unread count cache %s failed', method, exc_info=True)
+        return None
+
+def unread_count(user_id):
+    count = cache_call('get', unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read=False).count()
+        cache_call('set', unread_key(user_id), count, UNREAD_TIMEOUT)
+    return count
+
+def bump_unread(user_id):
+    try:
+        cache.incr(unread_key(user_id))
+    except ValueError:
+        # Not cached yet; the next unread_count() computes it from the table.
+        pass
+    except Exception:
+        logger.warning('Unread count cache incr failed', exc_info=True)
+
+def fit_message(message):
+    # Listing titles and usernames can outgrow the column; cut here rather than fail the
+    # already committed write that triggered the notification.
+    return Truncator(message).chars(Notification._meta.get_field('message').max_length)
+
+def notify(user_id, kind, message, url='', group_key=''):
+    message = fit_message(message)
+    with transaction.atomic():
+        notification = None
+        if group_key:
+            notification = (
+                Notification.objects.select_for_update()
+                .filter(user_id=user_id, group_key=group_key, read=False).order_by('-id').first()
+            )
+        if notification:
+            notification.count = F('count') + 1
+            notification.message = message
+            notification.created_at = timezone.now()
+            notification.save(update_fields=['count', 'message', 'created_at'])
+            notification.refresh_from_db(fields=['count'])
+        else:
+            notification = Notification.objects.create(user_id=user_id, kind=kind, message=message, url=url, group_key=group_key)
+            transaction.on_commit(lambda: bump_unread(user_id))
+    transaction.on_commit(lambda: deliver([notification]))
+    return notification
+
+def notify_many(user_ids, kind, message, url=''):
+    # One-to-many events skip coalescing: each recipient gets a fresh row, inserted in bulk.
+    user_ids = list(user_ids)
+    message = fit_message(message)
+    for i in range(0, len(user_ids), FANOUT_BATCH_SIZE):
+        batch = Notification.objects.bulk_create([
+            Notification(user_id=user_id, kind=kind, message=message, url=url)
+            for user_id in user_ids[i:i + FANOUT_BATCH_SIZE]
+        ])
+        cache_call('delete_many', [unread_key(n.user_id) for n in batch])
+        transaction.on_commit(lambda batch=batch: deliver(batch))
+    return len(user_ids)
+
+def mark_read(user_id, ids=None):
+    notifications = Notification.objects.filter(user_id=user_id, read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    updated = notifications.update(read=True)
+    if updated:
+        cache_call('delete', unread_key(user_id))
+    return updated
+
+def unread_since(user_id, after=0, limit=REPLAY_LIMIT):
+    return list(Notification.objects.filter(user_id=user_id, read=False, id__gt=after).order_by('-id')[:limit])[::-1]
+
+def payload(notification):
+    return {
+        'id': notification.pk,
+        'kind': notification.kind,
+        'message': notification.text,
+        'url': notification.url,
+        'count': notification.count,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+def deliver(notifications):
+    for notification in notifications:
+        dispatcher.send(f'user_{notification.user_id}', {'type': 'send_notification', **payload(notification)})
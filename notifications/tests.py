@@ -1,3 +1,134 @@
-from django.test import TestCase
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from core.metrics import registry
+from core.models import Message
+from .dispatch import Dispatcher
+from .models import Notification
+from .notify import notify, notify_many, mark_read, unread_count
+from .routing import websocket_urlpatterns
 
-# Create your tests here.
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class ChatConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+
+    def connect(self, user, query=''):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{query}')
+        communicator.scope['user'] = user
+        return communicator
+
+    def test_persists_acks_and_delivers(self):
+        async def run():
+            alice, bob = self.connect(self.alice), self.connect(self.bob)
+            await alice.connect()
+            await bob.connect()
+            await alice.send_json_to({'receiver': self.bob.id, 'content': 'hi', 'client_id': 1})
+            ack = await alice.receive_json_from()
+            delivered = await bob.receive_json_from()
+            await alice.send_json_to({'receiver': 999999, 'content': 'hello?'})
+            error = await alice.receive_json_from()
+            await alice.disconnect()
+            await bob.disconnect()
+            return ack, delivered, error
+        ack, delivered, error = async_to_sync(run)()
+        message = Message.objects.get()
+        self.assertEqual((ack['type'], ack['client_id'], ack['message']['id']), ('ack', 1, message.id))
+        self.assertEqual(delivered['message']['id'], message.id)
+        self.assertEqual(error['error'], 'Unknown receiver')
+
+    def test_replays_messages_after_cursor(self):
+        first = Message.objects.create(sender=self.alice, receiver=self.bob, content='one')
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='two')
+
+        async def run():
+            bob = self.connect(self.bob, f'?after={first.id}')
+            await bob.connect()
+            replayed = await bob.receive_json_from()
+            nothing_else = await bob.receive_nothing()
+            await bob.disconnect()
+            return replayed, nothing_else
+        replayed, nothing_else = async_to_sync(run)()
+        self.assertEqual(replayed['message']['content'], 'two')
+        self.assertTrue(nothing_else)
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, CACHES=LOCMEM_CACHE)
+class NotifyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner')
+        self.fans = [User.objects.create(username=f'fan{i}') for i in range(3)]
+
+    def test_coalesces_unread_notifications_with_the_same_key(self):
+        for fan in self.fans:
+            notify(self.owner.id, 'comment', f'{fan.username} commented on your post', group_key='comment:1')
+        notification = Notification.objects.get(user=self.owner)
+        self.assertEqual((notification.count, notification.text), (3, 'fan2 commented on your post and 2 more'))
+        self.assertEqual(unread_count(self.owner.id), 1)
+        mark_read(self.owner.id)
+        notify(self.owner.id, 'comment', 'fan0 commented on your post', group_key='comment:1')
+        self.assertEqual(Notification.objects.filter(user=self.owner).count(), 2)
+        self.assertEqual(unread_count(self.owner.id), 1)
+
+    def test_fan_out_writes_one_row_per_recipient(self):
+        self.assertEqual(unread_count(self.fans[0].id), 0)
+        notify_many([fan.id for fan in self.fans], 'listing', 'owner listed Tent')
+        self.assertEqual(Notification.objects.filter(kind='listing').count(), 3)
+        self.assertEqual(unread_count(self.fans[0].id), 1)
+
+    def test_long_messages_are_truncated_to_fit(self):
+        message = f"{'u' * 150} booked {'t' * 200}"
+        notification = notify(self.owner.id, 'booking', message)
+        self.assertEqual(len(notification.message), 255)
+        self.assertTrue(notification.message.endswith('…'))
+        notify_many([self.fans[0].id], 'listing', message)
+        self.assertEqual(len(Notification.objects.get(user=self.fans[0]).message), 255)
+
+    def test_cache_outage_falls_back_to_the_table(self):
+        down = mock.Mock(**{f'{method}.side_effect': ConnectionError for method in ('get', 'set', 'incr', 'delete', 'delete_many')})
+        with mock.patch('notifications.notify.cache', down), mock.patch('notifications.notify.deliver'):
+            with self.captureOnCommitCallbacks(execute=True):
+                notify(self.owner.id, 'booking', 'fan0 booked Tent')
+            notify_many([self.owner.id], 'listing', 'fan1 listed Bike')
+            self.assertEqual(unread_count(self.owner.id), 2)
+            self.client.force_login(self.owner)
+            self.assertEqual(self.client.get('/notifications/').status_code, 200)
+            self.assertEqual(mark_read(self.owner.id), 2)
+            self.assertEqual(unread_count(self.owner.id), 0)
+
+class DispatcherTest(TestCase):
+    class FlakyLayer:
+        def __init__(self):
+            self.sent = []
+
+        async def group_send(self, group, event):
+            if group == 'down':
+                raise ConnectionError('layer unavailable')
+            self.sent.append(group)
+
+    def outcomes(self):
+        return {dict(labels)['outcome']: n for (name, labels), n in registry.counters.items() if name == 'channel_dispatch_total'}
+
+    def test_failed_sends_are_counted_not_raised(self):
+        layer = self.FlakyLayer()
+        dispatcher = Dispatcher(layer=layer)
+        before = self.outcomes()
+        async_to_sync(dispatcher.deliver)([('down', {}, 0), ('user_1', {}, 0)])
+        after = self.outcomes()
+        self.assertEqual(layer.sent, ['user_1'])
+        self.assertEqual(after.get('failed', 0) - before.get('failed', 0), 1)
+        self.assertEqual(after.get('sent', 0) - before.get('sent', 0), 1)
+
+    def test_sheds_events_when_the_queue_is_full(self):
+        dispatcher = Dispatcher(max_pending=1, layer=self.FlakyLayer())
+        dispatcher.ensure_worker = lambda: None
+        self.assertTrue(dispatcher.send('user_1', {}))
+        self.assertFalse(dispatcher.send('user_1', {}))
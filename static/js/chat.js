@@ -1,16 +1,81 @@
 document.addEventListener('DOMContentLoaded', () => {
-    const ws = new WebSocket(`ws://${window.location.host}/ws/chat/`);
-    ws.onmessage = function(e) {
-        const data = JSON.parse(e.data);
-        const messages = document.getElementById('chat-messages');
-        messages.innerHTML += `
-            <div class="text-left">
-                <p class="inline-block p-3 rounded-lg bg-gray-200 dark:bg-gray-600 dark:text-gray-200 shadow-sm">${data.message.content}</p>
-                <p class="text-xs text-gray-500 dark:text-gray-400 mt-1">${new Date(data.message.timestamp).toLocaleString()}</p>
-            </div>`;
+    const messages = document.getElementById('chat-messages');
+    const form = document.getElementById('chat-form');
+    const userId = parseInt(messages.dataset.user, 10);
+    const otherId = parseInt(messages.dataset.other, 10);
+    let lastId = parseInt(messages.dataset.lastId || '0', 10);
+    let ws = null;
+    let retry = 1000;
+    let nextClientId = 0;
+
+    function bubble(message, mine) {
+        const wrapper = document.createElement('div');
+        wrapper.className = mine ? 'text-right' : 'text-left';
+        const content = document.createElement('p');
+        content.className = mine ? 'inline-block p-3 rounded-lg bg-teal-600 text-white shadow-sm' : 'inline-block p-3 rounded-lg bg-gray-200 dark:bg-gray-600 dark:text-gray-200 shadow-sm';
+        content.textContent = message.content;
+        const time = document.createElement('p');
+        time.className = 'text-xs text-gray-500 dark:text-gray-400 mt-1';
+        time.textContent = new Date(message.timestamp).toLocaleString();
+        wrapper.append(content, time);
+        return wrapper;
+    }
+
+    function show(message) {
+        lastId = Math.max(lastId, message.id);
+        const inConversation = [message.sender_id, message.receiver_id].includes(otherId);
+        if (!inConversation || document.querySelector(`[data-message-id="${message.id}"]`)) {
+            return;
+        }
+        const node = bubble(message, message.sender_id === userId);
+        node.dataset.messageId = message.id;
+        messages.append(node);
         messages.scrollTop = messages.scrollHeight;
-    };
-    ws.onclose = function() {
-        console.error('Chat WebSocket closed unexpectedly');
-    };
-});
\ No newline at end of file
+    }
+
+    function connect() {
+        // Resume from the last message seen so nothing sent while disconnected is lost.
+        ws = new WebSocket(`ws://${window.location.host}/ws/chat/?after=${lastId}`);
+        ws.onopen = () => { retry = 1000; };
+        ws.onmessage = function(e) {
+            const data = JSON.parse(e.data);
+            if (data.type === 'message' || data.type === 'ack') {
+                show(data.message);
+            } else if (data.type === 'error') {
+                console.error('Chat error:', data.error);
+            }
+        };
+        ws.onclose = function() {
+            setTimeout(connect, retry);
+            retry = Math.min(retry * 2, 30000);
+        };
+    }
+
+    form.addEventListener('submit', e => {
+        if (!ws || ws.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        e.preventDefault();
+        const input = form.querySelector('[name="content"]');
+        ws.send(JSON.stringify({receiver: otherId, content: input.value, client_id: ++nextClientId}));
+        input.value = '';
+    });
+
+    const older = document.getElementById('load-older');
+    if (older) {
+        older.addEventListener('click', async () => {
+            const data = await (await fetch(`${older.dataset.url}?cursor=${encodeURIComponent(older.dataset.cursor)}`)).json();
+            const height = messages.scrollHeight;
+            data.messages.reverse().forEach(message => older.after(bubble(message, message.sender_id === userId)));
+            messages.scrollTop += messages.scrollHeight - height;
+            if (data.next) {
+                older.dataset.cursor = data.next;
+            } else {
+                older.remove();
+            }
+        });
+    }
+
+    connect();
+    messages.scrollTop = messages.scrollHeight;
+});
@@ -0,0 +1,28 @@
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.load-comments').forEach(button => {
+        let cursor = null;
+        let skip = parseInt(button.dataset.skip || '0', 10);
+        const container = document.getElementById(button.dataset.target);
+        button.addEventListener('click', async () => {
+            const url = cursor ? `${button.dataset.url}?cursor=${encodeURIComponent(cursor)}` : button.dataset.url;
+            const data = await (await fetch(url)).json();
+            // Pages come newest first; the first few are already rendered inline.
+            data.comments.slice(skip).forEach(comment => {
+                const p = document.createElement('p');
+                p.className = 'text-sm text-gray-500 dark:text-gray-400';
+                const user = document.createElement('strong');
+                user.textContent = comment.user;
+                const date = document.createElement('span');
+                date.className = 'text-xs';
+                date.textContent = ` (${comment.date.slice(0, 10)})`;
+                p.append(user, `: ${comment.text}`, date);
+                container.prepend(p);
+            });
+            skip = 0;
+            cursor = data.next;
+            if (!cursor) {
+                button.remove();
+            }
+        });
+    });
+});
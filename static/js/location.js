@@ -0,0 +1,22 @@
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.use-location').forEach(button => {
+        if (!navigator.geolocation) {
+            button.classList.add('hidden');
+            return;
+        }
+        button.addEventListener('click', () => {
+            const form = button.closest('form');
+            button.disabled = true;
+            navigator.geolocation.getCurrentPosition(position => {
+                form.querySelector('[name="lat"], [name="latitude"]').value = position.coords.latitude.toFixed(6);
+                form.querySelector('[name="lng"], [name="longitude"]').value = position.coords.longitude.toFixed(6);
+                button.disabled = false;
+                if (button.dataset.submit) {
+                    form.submit();
+                }
+            }, () => {
+                button.disabled = false;
+            }, {maximumAge: 600000, timeout: 10000});
+        });
+    });
+});